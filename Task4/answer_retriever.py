@@ -0,0 +1,100 @@
+import os
+import time
+import joblib
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from bm25_engine import corpus_fingerprint
+
+# ✅ **Cosine Nearest-Neighbour Answer Retriever**
+# Replaces the KNeighborsClassifier that used full answer texts as class labels.
+# Questions are stored once as L2-normalised TF-IDF rows, a query is one sparse
+# matmul against them, and results are QA row indices (look the answer up in qa_data).
+DEFAULT_RETRIEVER_PATH = "qa_retriever"
+
+
+class AnswerRetriever:
+    def __init__(self, vectorizer, matrix, fingerprint=None):
+        self.vectorizer = vectorizer
+        self.matrix = matrix.tocsr()  # [n_questions, n_terms], rows L2-normalised
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def fit(cls, questions, fingerprint=None):
+        vectorizer = TfidfVectorizer(norm="l2", dtype=np.float32)
+        matrix = vectorizer.fit_transform(questions)
+        return cls(vectorizer, matrix, fingerprint)
+
+    def batch_top_k(self, queries, k=5):
+        """Returns (indices, cosine scores), each [n_queries, k], best first."""
+        similarities = (self.vectorizer.transform(queries) @ self.matrix.T).toarray()
+        k = min(k, similarities.shape[1])
+        if k < similarities.shape[1]:
+            top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(similarities.shape[1]), (len(queries), 1))
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.lexsort((top, -top_scores), axis=1)
+        indices = np.take_along_axis(top, order, axis=1)
+        return indices, np.take_along_axis(similarities, indices, axis=1)
+
+    def top_k(self, query, k=5):
+        indices, scores = self.batch_top_k([query], k)
+        return indices[0], scores[0]
+
+    def save(self, path=DEFAULT_RETRIEVER_PATH):
+        os.makedirs(path, exist_ok=True)
+        sp.save_npz(os.path.join(path, "questions.npz"), self.matrix, compressed=False)
+        joblib.dump({"vectorizer": self.vectorizer, "fingerprint": self.fingerprint},
+                    os.path.join(path, "vectorizer.joblib"))
+
+    @classmethod
+    def load(cls, path=DEFAULT_RETRIEVER_PATH):
+        state = joblib.load(os.path.join(path, "vectorizer.joblib"))
+        return cls(state["vectorizer"], sp.load_npz(os.path.join(path, "questions.npz")), state["fingerprint"])
+
+
+def load_or_fit(questions, path=DEFAULT_RETRIEVER_PATH):
+    """Loads the persisted index if it matches the current questions, otherwise refits and saves it."""
+    fingerprint = corpus_fingerprint(questions)
+    if os.path.exists(os.path.join(path, "vectorizer.joblib")):
+        retriever = AnswerRetriever.load(path)
+        if retriever.fingerprint == fingerprint:
+            return retriever
+    retriever = AnswerRetriever.fit(questions, fingerprint)
+    retriever.save(path)
+    return retriever
+
+
+# ✅ **Score Fusion with BM25**
+def fuse_scores(rankings, weights=None, k=5):
+    """Fuses several (indices, scores) rankings into one list of (index, fused score), best first.
+
+    Each ranking's scores are divided by its best score, so BM25 (unbounded) and
+    cosine (0..1) contribute on the same scale before the weighted sum.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for (indices, scores), weight in zip(rankings, weights):
+        best = float(np.max(scores)) if len(scores) else 0.0
+        if best <= 0:
+            continue
+        for index, score in zip(indices, scores):
+            fused[int(index)] = fused.get(int(index), 0.0) + weight * float(score) / best
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+if __name__ == "__main__":
+    from corpus import DEFAULT_CORPUS_PATH
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Build the cosine answer retriever over MedQuAD questions.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    args = parser.parse_args()
+
+    questions = pd.read_parquet(args.corpus)["Question"].tolist()
+    start_time = time.time()
+    retriever = load_or_fit(questions)
+    print(f"✅ Retriever ready: {retriever.matrix.shape[0]} questions, {retriever.matrix.shape[1]} terms "
+          f"({time.time() - start_time:.2f}s)")
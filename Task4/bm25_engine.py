@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+import scipy.sparse as sp
+
+# ✅ **Sparse-Matrix BM25 (Okapi)**
+# Every document's BM25 term weight is precomputed into a term x document CSR matrix,
+# so scoring a query is one sparse vector-matrix product instead of a Python loop over
+# documents. Weights follow rank_bm25.BM25Okapi exactly (same idf floor, k1, b).
+DEFAULT_INDEX_PATH = "bm25_index.npz"
+
+
+def tokenize(text):
+    return text.lower().split()
+
+
+def corpus_fingerprint(documents):
+    digest = hashlib.sha1()
+    for document in documents:
+        digest.update(document.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SparseBM25:
+    def __init__(self, weights, vocabulary, fingerprint=None):
+        self.weights = weights.tocsr()  # [n_terms, n_docs]
+        self.vocabulary = vocabulary
+        self.fingerprint = fingerprint
+        self.n_docs = weights.shape[1]
+
+    @classmethod
+    def from_corpus(cls, tokenized_corpus, k1=1.5, b=0.75, epsilon=0.25, fingerprint=None):
+        vocabulary, rows, cols, counts = {}, [], [], []
+        doc_lens = np.zeros(len(tokenized_corpus), dtype=np.float64)
+        for doc_id, tokens in enumerate(tokenized_corpus):
+            doc_lens[doc_id] = len(tokens)
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, count in frequencies.items():
+                rows.append(vocabulary.setdefault(token, len(vocabulary)))
+                cols.append(doc_id)
+                counts.append(count)
+
+        n_docs = len(tokenized_corpus)
+        tf = sp.csr_matrix((np.asarray(counts, dtype=np.float64), (rows, cols)), shape=(len(vocabulary), n_docs))
+        avgdl = doc_lens.sum() / n_docs if n_docs else 0.0
+
+        # IDF as in rank_bm25: negative values are floored to epsilon * average idf
+        df = np.diff(tf.indptr).astype(np.float64)
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+
+        # w = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)), computed on the nonzeros only
+        norms = k1 * (1 - b + b * doc_lens / avgdl) if avgdl else np.full(n_docs, k1)
+        term_rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        tf.data = idf[term_rows] * tf.data * (k1 + 1) / (tf.data + norms[tf.indices])
+        return cls(tf, vocabulary, fingerprint)
+
+    def _query_matrix(self, queries):
+        rows, cols = [], []
+        for row, tokens in enumerate(queries):
+            for token in tokens:
+                term_id = self.vocabulary.get(token)
+                if term_id is not None:
+                    rows.append(row)
+                    cols.append(term_id)
+        # Repeated query terms count repeatedly, as in BM25Okapi.get_scores
+        return sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(queries), len(self.vocabulary)))
+
+    def get_batch_scores(self, queries):
+        """Dense [n_queries, n_docs] score matrix for tokenized queries."""
+        return (self._query_matrix(queries) @ self.weights).toarray()
+
+    def get_scores(self, query_tokens):
+        """Drop-in replacement for BM25Okapi.get_scores."""
+        return self.get_batch_scores([query_tokens])[0]
+
+    def top_k(self, query_tokens, k=10):
+        indices, scores = self.batch_top_k([query_tokens], k)
+        return indices[0], scores[0]
+
+    def batch_top_k(self, queries, k=10):
+        """Returns (indices, scores), each [n_queries, k], best first; ties keep the lower doc id like argmax."""
+        scores = self.get_batch_scores(queries)
+        k = min(k, self.n_docs)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for row, row_scores in enumerate(scores):
+            if k < self.n_docs:
+                kth = row_scores[np.argpartition(-row_scores, k - 1)[k - 1]]
+                # Everything above the k-th score, plus every doc tied with it, so ties resolve by doc id
+                candidates = np.concatenate([np.flatnonzero(row_scores > kth), np.flatnonzero(row_scores == kth)])
+            else:
+                candidates = np.arange(self.n_docs)
+            order = np.lexsort((candidates, -row_scores[candidates]))[:k]
+            indices[row] = candidates[order]
+        return indices, np.take_along_axis(scores, indices, axis=1)
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        tmp_path = path + ".tmp.npz"
+        terms = np.empty(len(self.vocabulary), dtype=object)
+        for term, term_id in self.vocabulary.items():
+            terms[term_id] = term
+        sp.save_npz(tmp_path, self.weights, compressed=False)
+        os.replace(tmp_path, path)
+        with open(path + ".json", "w", encoding="utf-8") as meta_file:
+            json.dump({"terms": terms.tolist(), "fingerprint": self.fingerprint}, meta_file)
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with open(path + ".json", "r", encoding="utf-8") as meta_file:
+            meta = json.load(meta_file)
+        vocabulary = {term: i for i, term in enumerate(meta["terms"])}
+        return cls(sp.load_npz(path), vocabulary, meta.get("fingerprint"))
+
+
+def load_or_build(questions, path=DEFAULT_INDEX_PATH):
+    """Loads the persisted matrix if it was built from the same questions, otherwise rebuilds and saves it."""
+    fingerprint = corpus_fingerprint(questions)
+    if os.path.exists(path) and os.path.exists(path + ".json"):
+        engine = SparseBM25.load(path)
+        if engine.fingerprint == fingerprint:
+            return engine
+    engine = SparseBM25.from_corpus([tokenize(q) for q in questions], fingerprint=fingerprint)
+    engine.save(path)
+    return engine
+
+
+# ✅ **Benchmark Against rank_bm25**
+def benchmark(questions, queries, k=10):
+    from rank_bm25 import BM25Okapi
+
+    tokenized = [tokenize(q) for q in questions]
+    tokenized_queries = [tokenize(q) for q in queries]
+
+    start_time = time.perf_counter()
+    reference = BM25Okapi(tokenized)
+    reference_build = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    engine = SparseBM25.from_corpus(tokenized)
+    engine_build = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    reference_scores = [reference.get_scores(q) for q in tokenized_queries]
+    reference_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    single = [engine.top_k(q, k) for q in tokenized_queries]
+    single_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    batch_indices, _ = engine.batch_top_k(tokenized_queries, k)
+    batch_time = time.perf_counter() - start_time
+
+    top1_matches = sum(int(np.argmax(ref)) == int(idx[0]) for ref, (idx, _) in zip(reference_scores, single))
+    max_diff = max(float(np.abs(ref - engine.get_scores(q)).max()) for ref, q in zip(reference_scores, tokenized_queries))
+    topk_overlap = np.mean([
+        len(set(np.argsort(-ref, kind="stable")[:k].tolist()) & set(idx.tolist())) / k
+        for ref, idx in zip(reference_scores, batch_indices)
+    ])
+
+    n = len(queries)
+    print(f"📊 BM25 on {len(questions)} documents, {n} queries")
+    print(f"   build      : rank_bm25 {reference_build:.2f}s | sparse {engine_build:.2f}s")
+    print(f"   rank_bm25  : {reference_time / n * 1000:8.3f} ms/query ({n / reference_time:,.0f} QPS)")
+    print(f"   sparse     : {single_time / n * 1000:8.3f} ms/query ({n / single_time:,.0f} QPS)")
+    print(f"   sparse x{n:<4d}: {batch_time / n * 1000:8.3f} ms/query ({n / batch_time:,.0f} QPS, batched)")
+    print(f"   top-1 agreement {top1_matches}/{n} | top-{k} overlap {topk_overlap:.3f} | max score diff {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    from corpus import DEFAULT_CORPUS_PATH
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Build or benchmark the sparse BM25 index over MedQuAD questions.")
+    parser.add_argument("command", choices=["build", "benchmark"])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--queries", type=int, default=500, help="Number of corpus questions reused as queries")
+    args = parser.parse_args()
+
+    questions = pd.read_parquet(args.corpus)["Question"].tolist()
+    if args.command == "build":
+        load_or_build(questions)
+        print(f"✅ BM25 index saved to {DEFAULT_INDEX_PATH}")
+    else:
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(questions), size=min(args.queries, len(questions)), replace=False)
+        benchmark(questions, [questions[i] for i in sample])
@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import argparse
+import xml.etree.ElementTree as ET
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+# ✅ **Pre-parsed MedQuAD Corpus**
+# The XML tree is parsed once into a columnar Parquet file. A manifest records the
+# mtime, size and SHA-1 of every XML file, so later builds only re-parse files
+# that actually changed and reuse the stored rows for everything else.
+DEFAULT_CORPUS_PATH = "medquad_corpus.parquet"
+DEFAULT_MANIFEST_PATH = "medquad_manifest.json"
+MANIFEST_VERSION = 1
+COLUMNS = ["Focus", "Question", "Answer", "File"]
+
+
+def _text(element, default):
+    return element.text.strip() if element is not None and element.text else default
+
+
+# Function to parse one XML file and extract Q&A
+def parse_medquad_file(file_path):
+    rows = []
+    try:
+        root = ET.parse(file_path).getroot()
+        focus = _text(root.find("Focus"), "Unknown")
+        for qapair in root.findall(".//QAPair"):
+            question = _text(qapair.find("Question"), "No Question")
+            answer = _text(qapair.find("Answer"), "No Answer")
+            rows.append({"Focus": focus, "Question": question, "Answer": answer})
+    except Exception as e:
+        print(f"Error parsing {file_path}: {e}")
+    return rows
+
+
+def _parse_with_path(args):
+    relative_path, file_path = args
+    return relative_path, parse_medquad_file(file_path)
+
+
+def _sha1(file_path):
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _scan_xml_files(folder_path):
+    files = {}
+    for root_folder, _, names in os.walk(folder_path):
+        for name in names:
+            if name.endswith(".xml"):
+                file_path = os.path.join(root_folder, name)
+                files[os.path.relpath(file_path, folder_path)] = file_path
+    return files
+
+
+def _load_manifest(manifest_path, folder_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("folder") != os.path.abspath(folder_path):
+        return {}
+    return manifest["files"]
+
+
+# ✅ **Incremental Build (parallel XML parsing)**
+def build_corpus(folder_path, corpus_path=DEFAULT_CORPUS_PATH, manifest_path=DEFAULT_MANIFEST_PATH, workers=None):
+    """Brings the Parquet corpus up to date with the XML folder and returns it as a DataFrame."""
+    start_time = time.time()
+    xml_files = _scan_xml_files(folder_path)
+    old_entries = _load_manifest(manifest_path, folder_path) if os.path.exists(corpus_path) else {}
+
+    entries, changed = {}, []
+    for relative_path, file_path in xml_files.items():
+        stat = os.stat(file_path)
+        entry = {"mtime": stat.st_mtime, "size": stat.st_size}
+        old = old_entries.get(relative_path)
+        if old and old["mtime"] == entry["mtime"] and old["size"] == entry["size"]:
+            entries[relative_path] = old
+            continue
+        # mtime/size moved: only re-parse if the content hash differs too
+        entry["sha1"] = _sha1(file_path)
+        entries[relative_path] = entry
+        if not old or old.get("sha1") != entry["sha1"]:
+            changed.append(relative_path)
+
+    removed = set(old_entries) - set(xml_files)
+    if not changed and not removed and os.path.exists(corpus_path):
+        if entries != old_entries:
+            _write_manifest(manifest_path, folder_path, entries)
+        print(f"✅ MedQuAD corpus is up to date ({len(xml_files)} files)")
+        return pd.read_parquet(corpus_path)
+
+    kept = pd.DataFrame(columns=COLUMNS)
+    if old_entries and os.path.exists(corpus_path):
+        previous = pd.read_parquet(corpus_path)
+        kept = previous[~previous["File"].isin(set(changed) | removed)]
+
+    parsed_rows = []
+    jobs = [(relative_path, xml_files[relative_path]) for relative_path in changed]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for relative_path, rows in executor.map(_parse_with_path, jobs, chunksize=64):
+            for row in rows:
+                row["File"] = relative_path
+                parsed_rows.append(row)
+
+    corpus = pd.concat([kept, pd.DataFrame(parsed_rows, columns=COLUMNS)], ignore_index=True)
+    corpus = corpus.sort_values(["File"], kind="stable").reset_index(drop=True)
+
+    # Write to a temp file and rename, so readers never see a half-written corpus
+    tmp_path = corpus_path + ".tmp"
+    corpus.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, corpus_path)
+    _write_manifest(manifest_path, folder_path, entries)
+
+    print(f"✅ MedQuAD corpus rebuilt: {len(changed)} changed, {len(removed)} removed, "
+          f"{len(corpus)} Q&A pairs in {time.time() - start_time:.1f}s")
+    return corpus
+
+
+def _write_manifest(manifest_path, folder_path, entries):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump({"version": MANIFEST_VERSION, "folder": os.path.abspath(folder_path), "files": entries},
+                  manifest_file)
+    os.replace(tmp_path, manifest_path)
+
+
+def load_corpus(folder_path, corpus_path=DEFAULT_CORPUS_PATH, manifest_path=DEFAULT_MANIFEST_PATH):
+    """Loads the corpus, rebuilding only if the XML folder changed (or reading as-is if it is missing)."""
+    if os.path.isdir(folder_path):
+        return build_corpus(folder_path, corpus_path, manifest_path)
+    if os.path.exists(corpus_path):
+        return pd.read_parquet(corpus_path)
+    print(f"Error: MedQuAD folder not found at {folder_path}")
+    return pd.DataFrame(columns=COLUMNS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse the MedQuAD XML files into a Parquet corpus.")
+    parser.add_argument("folder", help="MedQuAD root folder")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST_PATH)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    build_corpus(args.folder, args.corpus, args.manifest, workers=args.workers)
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+import spacy
+from spacy.matcher import PhraseMatcher
+from bm25_engine import corpus_fingerprint
+
+# ✅ **Precomputed Corpus Entities + Fast Query Tagging**
+# Offline: run spaCy NER over every MedQuAD question and answer with nlp.pipe
+# (batched, multi-process, NER only) and store entity -> QA ids.
+# Query time: a PhraseMatcher over that vocabulary tags queries with the tokenizer
+# alone, so no statistical model runs per query.
+DEFAULT_ENTITY_INDEX_PATH = "medquad_entities.json"
+SPACY_MODEL = "en_core_web_sm"
+# Numeric/temporal labels carry no medical meaning for retrieval
+IGNORED_LABELS = {"CARDINAL", "ORDINAL", "DATE", "TIME", "PERCENT", "QUANTITY", "MONEY"}
+FOCUS_LABEL = "FOCUS"
+
+
+def entity_index_fingerprint(qa_data, max_answer_chars):
+    """Hash of everything the index is built from: Focus terms, questions, answers and the NER settings."""
+    settings = [SPACY_MODEL, ",".join(sorted(IGNORED_LABELS)), str(max_answer_chars)]
+    return corpus_fingerprint(settings + [str(focus) for focus in qa_data["Focus"]] + qa_data["Question"].tolist()
+                              + [answer[:max_answer_chars] for answer in qa_data["Answer"]])
+
+
+def build_entity_index(qa_data, out_path=DEFAULT_ENTITY_INDEX_PATH, batch_size=256, n_process=2,
+                       max_answer_chars=3000):
+    start_time = time.time()
+    nlp = spacy.load(SPACY_MODEL, disable=["parser", "lemmatizer", "tagger", "attribute_ruler", "senter"])
+
+    entity_ids, entity_labels = defaultdict(set), defaultdict(Counter)
+
+    # The Focus of each QA pair (the disease/condition) is always part of the vocabulary
+    for qa_id, focus in enumerate(qa_data["Focus"]):
+        if focus and focus != "Unknown":
+            entity_ids[focus.lower()].add(qa_id)
+            entity_labels[focus.lower()][FOCUS_LABEL] += 1
+
+    texts = (
+        (f"{question}\n{answer[:max_answer_chars]}", qa_id)
+        for qa_id, (question, answer) in enumerate(zip(qa_data["Question"], qa_data["Answer"]))
+    )
+    for doc, qa_id in nlp.pipe(texts, as_tuples=True, batch_size=batch_size, n_process=n_process):
+        for ent in doc.ents:
+            if ent.label_ in IGNORED_LABELS or len(ent.text) < 3:
+                continue
+            entity = ent.text.strip().lower()
+            entity_ids[entity].add(qa_id)
+            entity_labels[entity][ent.label_] += 1
+
+    index = {
+        "fingerprint": entity_index_fingerprint(qa_data, max_answer_chars),
+        "max_answer_chars": max_answer_chars,
+        "entities": {
+            entity: {"label": entity_labels[entity].most_common(1)[0][0], "ids": sorted(ids)}
+            for entity, ids in entity_ids.items()
+        },
+    }
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as index_file:
+        json.dump(index, index_file)
+    os.replace(tmp_path, out_path)
+    print(f"✅ Entity index built: {len(index['entities'])} entities over {len(qa_data)} Q&A pairs "
+          f"in {time.time() - start_time:.1f}s")
+    return index
+
+
+class EntityMatcher:
+    def __init__(self, entities):
+        self.entities = entities
+        # Tokenizer-only pipeline: matching needs no tagger/parser/NER
+        self.nlp = spacy.blank("en")
+        self.matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+        patterns = list(self.nlp.tokenizer.pipe(entities))
+        for start in range(0, len(patterns), 10000):
+            self.matcher.add("ENTITY", patterns[start:start + 10000])
+
+    @classmethod
+    def from_focus(cls, qa_data):
+        """Fallback vocabulary (Focus terms only) when no offline entity index exists."""
+        entities = defaultdict(list)
+        for qa_id, focus in enumerate(qa_data["Focus"]):
+            if focus and focus != "Unknown":
+                entities[focus.lower()].append(qa_id)
+        return cls({entity: {"label": FOCUS_LABEL, "ids": ids} for entity, ids in entities.items()})
+
+    def tag(self, text):
+        """Returns {entity: label} for every known entity in the text (longest match wins)."""
+        doc = self.nlp.make_doc(text)
+        spans = spacy.util.filter_spans([doc[start:end] for _, start, end in self.matcher(doc)])
+        found = {}
+        for span in spans:
+            entity = span.text.lower()
+            if entity in self.entities:
+                found[entity] = self.entities[entity]["label"]
+        return found
+
+    def candidate_overlap(self, entities):
+        """Counts, per QA id, how many of the given entities it mentions."""
+        overlap = Counter()
+        for entity in entities:
+            overlap.update(self.entities.get(entity, {}).get("ids", []))
+        return overlap
+
+
+def load_entity_matcher(qa_data, path=DEFAULT_ENTITY_INDEX_PATH):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+        max_answer_chars = index.get("max_answer_chars")
+        if max_answer_chars and index.get("fingerprint") == entity_index_fingerprint(qa_data, max_answer_chars):
+            return EntityMatcher(index["entities"])
+        print("Entity index is out of date; using Focus terms only. Rebuild it with entities.py.")
+    return EntityMatcher.from_focus(qa_data)
+
+
+def boost_by_entities(indices, scores, overlap, boost=0.5):
+    """Re-ranks retrieval candidates: score * (1 + boost * number of shared entities)."""
+    boosted = [(int(i), float(s) * (1.0 + boost * overlap.get(int(i), 0))) for i, s in zip(indices, scores)]
+    return sorted(boosted, key=lambda item: (-item[1], item[0]))
+
+
+if __name__ == "__main__":
+    from corpus import DEFAULT_CORPUS_PATH
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Extract spaCy entities for every MedQuAD Q&A pair.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--n-process", type=int, default=2)
+    args = parser.parse_args()
+    build_entity_index(pd.read_parquet(args.corpus), batch_size=args.batch_size, n_process=args.n_process)
@@ -1,44 +1,19 @@
 import streamlit as st
-import xml.etree.ElementTree as ET
 import pandas as pd
-import spacy
 import os
-from rank_bm25 import BM25Okapi
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.neighbors import KNeighborsClassifier
-import joblib
+from corpus import load_corpus
+from qa_engine import DEFAULT_LIVEQA_CSV, DEFAULT_MEDQUAD_DIR, QAEngine
 
-# Load medical NLP model
-nlp = spacy.load("en_core_web_sm")
+# Paths (set MEDQUAD_DIR / LIVEQA_CSV to override)
+folder_path = DEFAULT_MEDQUAD_DIR  # XML dataset folder
+csv_file_path = DEFAULT_LIVEQA_CSV  # CSV file path
 
-# Function to parse XML files and extract Q&A
-def parse_medquad_xml(folder_path):
-    data = []
-    for root_folder, _, files in os.walk(folder_path):
-        for file in files:
-            if file.endswith(".xml"):
-                file_path = os.path.join(root_folder, file)
-                try:
-                    tree = ET.parse(file_path)
-                    root = tree.getroot()
-                    focus = root.find("Focus").text.strip() if root.find("Focus") is not None else "Unknown"
-                    
-                    for qapair in root.findall(".//QAPair"):
-                        question = qapair.find("Question").text.strip() if qapair.find("Question") is not None else "No Question"
-                        answer = qapair.find("Answer").text.strip() if qapair.find("Answer") is not None else "No Answer"
-                        data.append({"Focus": focus, "Question": question, "Answer": answer})
-                
-                except Exception as e:
-                    print(f"Error parsing {file_path}: {e}")
+# Load Q&A Data from the pre-parsed corpus (re-parses only changed XML files, once per process)
+@st.cache_resource(show_spinner="Loading MedQuAD corpus...")
+def load_qa_data():
+    return load_corpus(folder_path)
 
-    return pd.DataFrame(data)
-
-# Paths
-folder_path = r"D:\project101\Task4\MedQuAD-master\MedQuAD-master"  # XML dataset folder
-csv_file_path = r"D:\project101\Task4\MedQuAD-master\MedQuAD-master\QA-TestSet-LiveQA-Med-Qrels-2479-Answers\QA-TestSet-LiveQA-Med-Qrels-2479-Answers\All-2479-Answers-retrieved-from-MedQuAD.csv"  # CSV file path
-
-# Load XML Data
-qa_data = parse_medquad_xml(folder_path)
+qa_data = load_qa_data()
 
 # Load CSV Data
 if os.path.exists(csv_file_path):
@@ -47,47 +22,38 @@ else:
     print(f"Error: CSV file not found at {csv_file_path}")
     prompt_data = pd.DataFrame(columns=["Answer"])  # Empty DataFrame to avoid crashes
 
-# Tokenize and prepare BM25 retrieval
-if not qa_data.empty:
-    questions = qa_data["Question"].tolist()
-    tokenized_questions = [q.lower().split() for q in questions]
-    bm25 = BM25Okapi(tokenized_questions)
+# BM25 + cosine retriever + entity matcher, shared with the headless engine (qa_engine.py)
+@st.cache_resource(show_spinner="Building retrieval models...")
+def load_engine(_qa_data):
+    # Leading underscore: Streamlit skips hashing the DataFrame argument
+    return QAEngine(_qa_data)
 
-    # Train ML model for Q&A matching
-    tfidf_vectorizer = TfidfVectorizer()
-    X_tfidf = tfidf_vectorizer.fit_transform(qa_data["Question"])
-    y_labels = qa_data["Answer"]
-    model = KNeighborsClassifier(n_neighbors=5)
-    model.fit(X_tfidf, y_labels)
-    joblib.dump((tfidf_vectorizer, model), "qa_model.pkl")
+if not qa_data.empty:
+    engine = load_engine(qa_data)
 else:
     print("Error: No valid data found in XML files.")
 
-# Function to retrieve best matching answer using BM25
+# Function to retrieve best matching answer using BM25 (boosted by shared medical entities)
 def get_best_answer(user_query):
     if qa_data.empty:
         return "No data available.", "N/A"
-    
-    tokenized_query = user_query.lower().split()
-    scores = bm25.get_scores(tokenized_query)
-    best_idx = scores.argmax()
+    best_idx = engine.rank(user_query, k=1, method="bm25")[0][0]
     return qa_data.iloc[best_idx]["Answer"], qa_data.iloc[best_idx]["Focus"]
 
-# Function to predict answer using ML model
+# Function to predict answer using the nearest-neighbour retriever
 def ml_predict_answer(user_query):
     try:
-        tfidf_vectorizer, model = joblib.load("qa_model.pkl")
-        query_tfidf = tfidf_vectorizer.transform([user_query])
-        return model.predict(query_tfidf)[0]
+        best_idx = engine.rank(user_query, k=1, method="cosine")[0][0]
+        return qa_data.iloc[best_idx]["Answer"]
     except Exception as e:
         print(f"ML Prediction Error: {e}")
         return "No prediction available."
 
 # Medical entity recognition
 def extract_entities(text):
-    doc = nlp(text)
-    entities = {ent.label_: ent.text for ent in doc.ents}
-    return entities
+    if qa_data.empty:
+        return {}
+    return engine.extract_entities(text)
 
 # Streamlit UI
 st.title("Medical Q&A Chatbot")
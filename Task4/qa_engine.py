@@ -0,0 +1,344 @@
+import os
+import re
+import sys
+import json
+import contextlib
+import time
+import argparse
+import xml.etree.ElementTree as ET
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from corpus import load_corpus
+from bm25_engine import load_or_build, tokenize
+from answer_retriever import fuse_scores, load_or_fit
+from entities import SPACY_MODEL, boost_by_entities, load_entity_matcher
+
+# Paths (override with environment variables instead of editing the code)
+DEFAULT_MEDQUAD_DIR = os.environ.get("MEDQUAD_DIR", r"D:\project101\Task4\MedQuAD-master\MedQuAD-master")
+LIVEQA_DIR = os.path.join(DEFAULT_MEDQUAD_DIR, "QA-TestSet-LiveQA-Med-Qrels-2479-Answers",
+                          "QA-TestSet-LiveQA-Med-Qrels-2479-Answers")
+DEFAULT_LIVEQA_CSV = os.environ.get("LIVEQA_CSV", os.path.join(LIVEQA_DIR, "All-2479-Answers-retrieved-from-MedQuAD.csv"))
+DEFAULT_LIVEQA_QRELS = os.environ.get(
+    "LIVEQA_QRELS", os.path.join(LIVEQA_DIR, "All-qrels_LiveQAMed2017-TestQuestions_2479_Judged-Answers.txt"))
+# Test questions from https://github.com/abachaa/LiveQA_MedicalTask_TREC2017 (TestDataset folder)
+DEFAULT_LIVEQA_QUESTIONS = os.environ.get("LIVEQA_QUESTIONS", "TREC-2017-LiveQA-Medical-Test-Questions-w-summaries.xml")
+METHODS = ("bm25", "cosine", "hybrid")
+
+
+# ✅ **Reusable QA Engine (indexes loaded once)**
+class QAEngine:
+    def __init__(self, qa_data, candidates=10):
+        self.qa_data = qa_data.reset_index(drop=True)
+        self.candidates = candidates
+        questions = self.qa_data["Question"].tolist()
+        self.bm25 = load_or_build(questions)
+        self.retriever = load_or_fit(questions)
+        self.entity_matcher = load_entity_matcher(self.qa_data)
+        self._nlp = None
+        self._nlp_lock = threading.Lock()
+
+    @classmethod
+    def from_folder(cls, folder_path=DEFAULT_MEDQUAD_DIR, **kwargs):
+        return cls(load_corpus(folder_path), **kwargs)
+
+    def rank_batch(self, queries, k=10, method="bm25"):
+        """Ranks QA ids for many queries at once; returns a list of [(qa_id, score), ...] per query.
+
+        bm25: BM25 boosted by entity overlap; cosine: TF-IDF nearest neighbours;
+        hybrid: both rankings fused on a max-normalised scale.
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown ranking method {method!r}, expected one of {METHODS}")
+        depth = max(k, self.candidates)
+        rankings = []
+        if method in ("bm25", "hybrid"):
+            bm25_indices, bm25_scores = self.bm25.batch_top_k([tokenize(q) for q in queries], depth)
+        if method in ("cosine", "hybrid"):
+            cosine_indices, cosine_scores = self.retriever.batch_top_k(queries, depth)
+
+        for row, query in enumerate(queries):
+            if method == "cosine":
+                rankings.append([(int(i), float(s)) for i, s in zip(cosine_indices[row], cosine_scores[row])][:k])
+                continue
+            overlap = self.entity_matcher.candidate_overlap(self.entity_matcher.tag(query))
+            boosted = boost_by_entities(bm25_indices[row], bm25_scores[row], overlap)
+            if method == "bm25":
+                rankings.append(boosted[:k])
+            else:
+                boosted_indices = [i for i, _ in boosted]
+                boosted_scores = [s for _, s in boosted]
+                rankings.append(fuse_scores([(boosted_indices, boosted_scores),
+                                             (cosine_indices[row], cosine_scores[row])], k=k))
+        return rankings
+
+    def rank(self, query, k=10, method="bm25"):
+        return self.rank_batch([query], k, method)[0]
+
+    def extract_entities(self, text):
+        entities = {}
+        tagged = self.entity_matcher.tag(text)
+        if tagged:
+            for entity, label in tagged.items():
+                entities.setdefault(label, []).append(entity)
+            return entities
+
+        # Nothing from the corpus vocabulary: fall back to the full spaCy pipeline, if it is installed
+        with self._nlp_lock:
+            if self._nlp is None:
+                import spacy
+                try:
+                    self._nlp = spacy.load(SPACY_MODEL, disable=["parser", "lemmatizer"])
+                except OSError:
+                    print(f"⚠️ spaCy model {SPACY_MODEL} is not installed; entities come from the corpus "
+                          f"vocabulary only (python -m spacy download {SPACY_MODEL})", file=sys.stderr)
+                    self._nlp = False
+            if not self._nlp:
+                return entities
+            doc = self._nlp(text)
+        for ent in doc.ents:
+            entities.setdefault(ent.label_, []).append(ent.text)
+        return entities
+
+    def answer(self, query):
+        """Full response used by the UI, CLI and HTTP service."""
+        best_id = self.rank(query, k=1, method="bm25")[0][0]
+        ml_id = self.rank(query, k=1, method="cosine")[0][0]
+        return {
+            "question": query,
+            "qa_id": best_id,
+            "answer": self.qa_data.at[best_id, "Answer"],
+            "focus": self.qa_data.at[best_id, "Focus"],
+            "ml_qa_id": ml_id,
+            "ml_answer": self.qa_data.at[ml_id, "Answer"],
+            "entities": self.extract_entities(query),
+        }
+
+    def answer_many(self, queries, workers=4):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.answer, queries))
+
+
+# ✅ **LiveQA Evaluation (retrieval quality + throughput)**
+# Queries are the real TREC 2017 LiveQA consumer questions; relevance comes from
+# the assessors' judgements (qrels) of the MedQuAD answers retrieved for them.
+# The answer CSV only maps each judged answer id to its text, which is matched
+# back to our MedQuAD pairs. Unjudged pairs count as not relevant.
+LIVEQA_PATTERN = re.compile(r"Question:\s*(?P<question>.*?)\s*URL:\s*(?P<url>\S+)\s*Answer:\s*(?P<answer>.*)", re.S)
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def _question_key(qid):
+    # Qrels and the question file don't always spell ids the same way ("TQ1" vs "1")
+    digits = re.sub(r"\D", "", str(qid))
+    return digits or str(qid).strip()
+
+
+def load_liveqa_questions(xml_path):
+    """Consumer questions from the TREC LiveQA test file: {question key: subject + message}."""
+    questions = {}
+    for element in ET.parse(xml_path).getroot().iter():
+        qid = element.get("qid")
+        if not qid or "QUESTION" not in element.tag.upper():
+            continue
+        original = element.find("Original-Question")
+        parts = [] if original is None else [original.findtext("SUBJECT"), original.findtext("MESSAGE")]
+        text = " ".join(part.strip() for part in parts if part and part.strip())
+        text = text or (element.findtext("NIST-PARAPHRASE") or "").strip()
+        if text:
+            questions[_question_key(qid)] = text
+    return questions
+
+
+def load_liveqa(questions_path, qrels_path, csv_path, qa_data, min_grade=3):
+    """(consumer question, relevant QA ids) pairs for every question with a judged-relevant answer.
+
+    An answer is relevant when its judgement grade (1-Incorrect ... 4-Excellent) is at least
+    `min_grade`. Returns the cases plus the number of questions left without any.
+    """
+    questions = load_liveqa_questions(questions_path)
+    by_answer, by_question = {}, {}
+    for qa_id, (question, answer) in enumerate(zip(qa_data["Question"], qa_data["Answer"])):
+        by_answer.setdefault(_normalize(answer)[:500], set()).add(qa_id)
+        by_question.setdefault(_normalize(question), set()).add(qa_id)
+
+    # Judged answer id -> MedQuAD pair(s), via the answer text stored in the CSV
+    answer_ids = {}
+    rows = pd.read_csv(csv_path)
+    for answer_id, text in zip(rows["AnswerID"], rows["Answer"]):
+        match = LIVEQA_PATTERN.match(str(text))
+        if match:
+            relevant = by_answer.get(_normalize(match.group("answer"))[:500]) or \
+                by_question.get(_normalize(match.group("question")))
+            if relevant:
+                answer_ids[str(answer_id).strip()] = relevant
+
+    judged = {}
+    with open(qrels_path, "r", encoding="utf-8") as qrels_file:
+        for line in qrels_file:
+            fields = line.split()
+            if len(fields) < 3 or not fields[1][:1].isdigit():
+                continue
+            qid, judgement, answer_id = fields[0], fields[1], fields[-1]
+            if int(judgement[0]) >= min_grade and answer_id in answer_ids:
+                judged.setdefault(_question_key(qid), set()).update(answer_ids[answer_id])
+
+    cases = [(questions[key], relevant) for key, relevant in judged.items() if key in questions]
+    return cases, len(questions) - len(cases)
+
+
+def evaluate(engine, cases, k=10, workers=4, methods=METHODS):
+    questions = [question for question, _ in cases]
+    report = {"cases": len(cases), "k": k, "methods": {}}
+
+    for method in methods:
+        latencies = [0.0] * len(questions)
+
+        def timed(i):
+            start_time = time.perf_counter()
+            ranking = engine.rank(questions[i], k, method)
+            latencies[i] = time.perf_counter() - start_time
+            return ranking
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rankings = list(executor.map(timed, range(len(questions))))
+        wall_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        engine.rank_batch(questions, k, method)
+        batch_time = time.perf_counter() - start_time
+
+        reciprocal_ranks, recall_hits = [], {1: 0, 5: 0, k: 0}
+        for ranking, (_, relevant) in zip(rankings, cases):
+            ranked_ids = [qa_id for qa_id, _ in ranking]
+            first = next((rank for rank, qa_id in enumerate(ranked_ids, 1) if qa_id in relevant), None)
+            reciprocal_ranks.append(1.0 / first if first else 0.0)
+            for cutoff in recall_hits:
+                recall_hits[cutoff] += int(first is not None and first <= cutoff)
+
+        n = max(len(cases), 1)
+        report["methods"][method] = {
+            "mrr": float(np.mean(reciprocal_ranks)) if reciprocal_ranks else 0.0,
+            **{f"recall@{cutoff}": hits / n for cutoff, hits in sorted(recall_hits.items())},
+            "qps": len(questions) / wall_time if wall_time else None,
+            "batch_qps": len(questions) / batch_time if batch_time else None,
+            "latency_p50_ms": float(np.percentile(latencies, 50) * 1000) if latencies else None,
+            "latency_p95_ms": float(np.percentile(latencies, 95) * 1000) if latencies else None,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"📊 LiveQA evaluation: {report['cases']} consumer questions with judged answers, k={report['k']}")
+    for method, metrics in report["methods"].items():
+        recalls = " ".join(f"{name}={value:.3f}" for name, value in metrics.items() if name.startswith("recall@"))
+        print(f"   {method:<7} MRR={metrics['mrr']:.3f} {recalls} | {metrics['qps']:,.0f} QPS "
+              f"(batch {metrics['batch_qps']:,.0f}) | p50 {metrics['latency_p50_ms']:.2f} ms "
+              f"p95 {metrics['latency_p95_ms']:.2f} ms")
+
+
+# ✅ **HTTP Service**
+def serve(engine, host="0.0.0.0", port=8080, workers=4):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "qa_pairs": len(engine.qa_data)})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/answer":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("body is not a JSON object")
+                questions = request.get("questions") or [request["question"]]
+                if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+                    raise ValueError("questions must be strings")
+            except (ValueError, KeyError):
+                self._send(400, {"error": 'send {"question": "..."} or {"questions": [...]}'})
+                return
+            self._send(200, {"answers": engine.answer_many(questions, workers=workers)})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"✅ QA service listening on http://{host}:{port} (POST /answer, GET /health)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless MedQuAD QA engine: ask, batch, serve or evaluate.")
+    parser.add_argument("--medquad-dir", default=DEFAULT_MEDQUAD_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ask_parser = subparsers.add_parser("ask")
+    ask_parser.add_argument("question")
+
+    batch_parser = subparsers.add_parser("batch", help="Answer one question per line")
+    batch_parser.add_argument("questions", help="Text file, or - for stdin")
+    batch_parser.add_argument("-o", "--output", help="JSON-lines output (default stdout)")
+    batch_parser.add_argument("--workers", type=int, default=4)
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=4)
+
+    eval_parser = subparsers.add_parser("evaluate", help="Score retrieval on the LiveQA consumer questions")
+    eval_parser.add_argument("--questions", default=DEFAULT_LIVEQA_QUESTIONS, help="TREC 2017 LiveQA test questions XML")
+    eval_parser.add_argument("--qrels", default=DEFAULT_LIVEQA_QRELS, help="Judgements of the retrieved answers")
+    eval_parser.add_argument("--csv", default=DEFAULT_LIVEQA_CSV, help="Judged answer ids and their text")
+    eval_parser.add_argument("--min-grade", type=int, default=3, help="Lowest judgement counted as relevant (1-4)")
+    eval_parser.add_argument("-k", type=int, default=10)
+    eval_parser.add_argument("--workers", type=int, default=4)
+    eval_parser.add_argument("--method", choices=METHODS, action="append")
+    eval_parser.add_argument("--out", help="Write the report as JSON (for regression comparisons)")
+
+    args = parser.parse_args()
+    start_time = time.time()
+    # Keep stdout clean for JSON output: loading progress goes to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        engine = QAEngine.from_folder(args.medquad_dir)
+    print(f"✅ Engine ready with {len(engine.qa_data)} Q&A pairs in {time.time() - start_time:.1f}s", file=sys.stderr)
+
+    if args.command == "ask":
+        print(json.dumps(engine.answer(args.question), indent=2))
+    elif args.command == "batch":
+        source = sys.stdin if args.questions == "-" else open(args.questions, "r", encoding="utf-8")
+        questions = [line.strip() for line in source if line.strip()]
+        out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        for result in engine.answer_many(questions, workers=args.workers):
+            out.write(json.dumps(result) + "\n")
+        if out is not sys.stdout:
+            out.close()
+    elif args.command == "serve":
+        serve(engine, args.host, args.port, args.workers)
+    else:
+        cases, skipped = load_liveqa(args.questions, args.qrels, args.csv, engine.qa_data, args.min_grade)
+        if skipped:
+            print(f"⚠️ Skipped {skipped} LiveQA questions without a relevant answer in the corpus", file=sys.stderr)
+        if not cases:
+            sys.exit("❌ No LiveQA question has a judged answer matching the corpus; check --questions/--qrels/--csv")
+        report = evaluate(engine, cases, k=args.k, workers=args.workers, methods=args.method or METHODS)
+        print_report(report)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, indent=2)
@@ -3,13 +3,9 @@ from langchain_ollama import OllamaLLM
 from langchain.prompts import ChatPromptTemplate
 import time
 import asyncio
-
-# Define available models
-models = {
-    "Llama3": "llama3",  # Llama3 model
-    "Mistral": "mistral",  # Mistral model
-    "Falcon": "falcon",  # Falcon model
-}
+from response_cache import ResponseCache, replay_chunks
+from llm_config import models, system_instruction
+from stream_metrics import StreamMetrics, iterate, log_metrics, stream_to_placeholder
 
 st.title("⚡️ Ultra-Fast Article Generator (Optimized for Responsiveness)")
 
@@ -23,7 +19,12 @@ def load_model(model_name):
 
 llm = load_model(models[selected_model])
 
-system_instruction = "You are an expert writer. Generate *very* concise, well-structured, and engaging articles. Focus on extreme brevity for lightning-fast responses. Prioritize speed over extensive detail."
+# Persistent article cache (exact topic match, or a close rephrasing of a cached topic)
+@st.cache_resource(show_spinner=False)
+def load_response_cache():
+    return ResponseCache("article_cache.db", semantic_threshold=0.95)
+
+response_cache = load_response_cache()
 
 prompt_template = ChatPromptTemplate.from_messages([
     ("system", system_instruction),
@@ -31,11 +32,9 @@ prompt_template = ChatPromptTemplate.from_messages([
 ])
 
 async def generate_article(topic):
-    # Stream the response token by token for faster feedback
-    response = ""
+    # Stream raw chunks; the UI appends them to a buffer and flushes in batches
     async for chunk in llm.astream(prompt_template.format(question=topic)):
-        response += chunk
-        yield response  # Stream the response to the UI
+        yield chunk
 
 async def main_async(topic):
     start_time = time.time()
@@ -43,14 +42,26 @@ async def main_async(topic):
         st.subheader("📝 Generated Article (Concise):")
         response_placeholder = st.empty()  # Placeholder for streaming response
 
-        # Stream the response
-        async for response in generate_article(topic):
-            response_placeholder.write(response)
+        # Replay a cached article through the same placeholder, otherwise stream it
+        cached_response, cache_kind = response_cache.get(models[selected_model], system_instruction, topic)
+        if cached_response is not None:
+            metrics = StreamMetrics(model=selected_model, source=f"cache-{cache_kind}")
+            await stream_to_placeholder(iterate(replay_chunks(cached_response)), response_placeholder, metrics)
+        else:
+            metrics = StreamMetrics(model=selected_model)
+            response = await stream_to_placeholder(generate_article(topic), response_placeholder, metrics)
+            if response:
+                response_cache.put(models[selected_model], system_instruction, topic, response)
+        log_metrics(metrics)
 
         execution_time = time.time() - start_time
+        cache_stats = response_cache.stats()
 
         st.subheader("📊 Performance Metrics:")
         st.write(f"⏱ Response Time: {execution_time:.2f} seconds")
+        st.write(metrics.summary_line())
+        st.write(f"🗄 Cache: {cache_kind or 'miss'} | Hit rate: {cache_stats['hit_rate']:.0%} "
+                 f"({cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} cached)")
         st.write(f"🤖 Model Used: {selected_model}")
 
         if execution_time > 2:
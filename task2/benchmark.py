@@ -0,0 +1,196 @@
+import os
+import csv
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from llm_config import models, system_instruction
+
+# Fixed topic set so runs are comparable across models and over time
+DEFAULT_TOPICS = [
+    "The future of renewable energy",
+    "How vaccines train the immune system",
+    "Why sleep matters for productivity",
+    "A beginner's guide to machine learning",
+    "The history of the printing press",
+    "Remote work and team communication",
+    "How blockchains reach consensus",
+    "Urban gardening for small apartments",
+]
+
+
+# ✅ **Offline Stub LLM (same astream interface as OllamaLLM)**
+class StubLLM:
+    """Streams a deterministic fake article with configurable latency, for CI runs without Ollama."""
+
+    def __init__(self, model, ttft=0.05, token_delay=0.002, tokens=120, seed=0):
+        self.model = model
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.seed = seed
+
+    async def astream(self, prompt):
+        rng = random.Random(f"{self.seed}:{self.model}:{prompt}")
+        words = prompt.split() or ["article"]
+        await asyncio.sleep(self.ttft)
+        for i in range(self.tokens):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            yield rng.choice(words) + " "
+
+
+def build_prompt(topic):
+    try:
+        from langchain.prompts import ChatPromptTemplate
+    except ImportError:
+        return f"System: {system_instruction}\nHuman: {topic}"
+    prompt_template = ChatPromptTemplate.from_messages([
+        ("system", system_instruction),
+        ("user", "{question}")
+    ])
+    return prompt_template.format(question=topic)
+
+
+def make_ollama_llm(model_name):
+    from langchain_ollama import OllamaLLM
+    return OllamaLLM(model=model_name)
+
+
+async def run_one(llm, model_label, topic, semaphore):
+    """Streams one article and records TTFT, total latency, token count and throughput."""
+    prompt = build_prompt(topic)
+    async with semaphore:
+        start_time = time.perf_counter()
+        first_token_time = None
+        chunks, output = 0, []
+        error = None
+        try:
+            async for chunk in llm.astream(prompt):
+                if first_token_time is None:
+                    first_token_time = time.perf_counter()
+                chunks += 1
+                output.append(chunk)
+        except Exception as e:
+            error = str(e)
+        end_time = time.perf_counter()
+
+    total = end_time - start_time
+    ttft = (first_token_time - start_time) if first_token_time is not None else None
+    generation_time = end_time - first_token_time if first_token_time is not None else 0.0
+    text = "".join(output)
+    return {
+        "model": model_label,
+        "topic": topic,
+        "ttft_s": ttft,
+        "total_s": total,
+        # Ollama streams roughly one token per chunk
+        "tokens": chunks,
+        "tokens_per_s": (chunks - 1) / generation_time if chunks > 1 and generation_time > 0 else None,
+        "output_chars": len(text),
+        "output_words": len(text.split()),
+        "error": error,
+    }
+
+
+# ✅ **Concurrent Multi-Model Benchmark**
+async def run_benchmark(model_map=None, topics=None, concurrency=2, repeats=1, llm_factory=make_ollama_llm):
+    """Runs every topic against every model with at most ``concurrency`` generations in flight."""
+    model_map = model_map or models
+    topics = topics or DEFAULT_TOPICS
+    semaphore = asyncio.Semaphore(concurrency)
+    llms = {label: llm_factory(name) for label, name in model_map.items()}
+    tasks = [
+        run_one(llms[label], label, topic, semaphore)
+        for _ in range(repeats)
+        for topic in topics
+        for label in model_map
+    ]
+    return await asyncio.gather(*tasks)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    rank = (len(values) - 1) * pct / 100
+    low, high = int(rank), min(int(rank) + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(results):
+    summary = []
+    for label in dict.fromkeys(r["model"] for r in results):
+        runs = [r for r in results if r["model"] == label]
+        ok = [r for r in runs if r["error"] is None]
+        totals = [r["total_s"] for r in ok]
+        ttfts = [r["ttft_s"] for r in ok if r["ttft_s"] is not None]
+        rates = [r["tokens_per_s"] for r in ok if r["tokens_per_s"] is not None]
+        summary.append({
+            "model": label,
+            "runs": len(runs),
+            "errors": len(runs) - len(ok),
+            "ttft_mean_s": statistics.mean(ttfts) if ttfts else None,
+            "tokens_per_s_mean": statistics.mean(rates) if rates else None,
+            "latency_p50_s": _percentile(totals, 50),
+            "latency_p90_s": _percentile(totals, 90),
+            "latency_p95_s": _percentile(totals, 95),
+            "latency_p99_s": _percentile(totals, 99),
+            "output_words_mean": statistics.mean(r["output_words"] for r in ok) if ok else None,
+        })
+    return summary
+
+
+def save_results(results, summary, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    for name, rows in (("runs", results), ("summary", summary)):
+        with open(os.path.join(out_dir, f"{name}.csv"), "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(rows[0].keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+    with open(os.path.join(out_dir, "results.json"), "w", encoding="utf-8") as json_file:
+        json.dump({"runs": results, "summary": summary}, json_file, indent=2)
+
+
+def print_comparison(summary):
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "n/a"
+
+    header = f"{'Model':<10} {'Runs':>5} {'Err':>4} {'TTFT(s)':>8} {'Tok/s':>8} {'p50(s)':>7} {'p95(s)':>7} {'Words':>6}"
+    print(header)
+    print("-" * len(header))
+    for row in summary:
+        print(f"{row['model']:<10} {row['runs']:>5} {row['errors']:>4} {fmt(row['ttft_mean_s'], '8.3f')} "
+              f"{fmt(row['tokens_per_s_mean'], '8.1f')} {fmt(row['latency_p50_s'], '7.2f')} "
+              f"{fmt(row['latency_p95_s'], '7.2f')} {fmt(row['output_words_mean'], '6.0f')}")
+
+    ranked = [row for row in summary if row["latency_p50_s"] is not None]
+    if ranked:
+        fastest = min(ranked, key=lambda row: row["latency_p50_s"])
+        print(f"\n🏆 Fastest median article: {fastest['model']} ({fastest['latency_p50_s']:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every article-generation model on a fixed topic set.")
+    parser.add_argument("--topics", help="Text file with one topic per line (default: built-in topic set)")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--stub", action="store_true", help="Use the offline stub LLM instead of Ollama")
+    parser.add_argument("--out", default="benchmark_results")
+    args = parser.parse_args()
+
+    topics = None
+    if args.topics:
+        with open(args.topics, "r", encoding="utf-8") as topics_file:
+            topics = [line.strip() for line in topics_file if line.strip()]
+
+    factory = StubLLM if args.stub else make_ollama_llm
+    start_time = time.time()
+    results = asyncio.run(run_benchmark(topics=topics, concurrency=args.concurrency, repeats=args.repeats,
+                                        llm_factory=factory))
+    summary = summarize(results)
+    save_results(results, summary, args.out)
+    print_comparison(summary)
+    print(f"\n✅ {len(results)} generations in {time.time() - start_time:.1f}s, results saved to {args.out}/")
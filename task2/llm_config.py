@@ -0,0 +1,10 @@
+# Shared settings for the article generator app and its benchmark harness
+
+# Define available models
+models = {
+    "Llama3": "llama3",  # Llama3 model
+    "Mistral": "mistral",  # Mistral model
+    "Falcon": "falcon",  # Falcon model
+}
+
+system_instruction = "You are an expert writer. Generate *very* concise, well-structured, and engaging articles. Focus on extreme brevity for lightning-fast responses. Prioritize speed over extensive detail."
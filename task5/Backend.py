@@ -1,26 +1,59 @@
-import io
-import base64
+import json
 import time
-import random
-from fastapi import FastAPI, HTTPException
+import hashlib
+import base64
+import anyio
+import asyncio
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from PIL import Image
-import google.generativeai as genai
 import uvicorn
 import os
 from dotenv import load_dotenv
+from gemini_client import AsyncGeminiClient, GeminiError, RESTTransport, SDKTransport, image_part, rest_generation_config
+from image_utils import prepare_image
+from response_cache import TieredCache, content_key
+from session_store import SessionStore, estimate_tokens
 
 # Load API key from environment variables
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Point at a local fake server (fake_gemini.py) for testing without a real key
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+MODEL_NAME = "gemini-1.5-pro"
+
+# Shared limits for all requests hitting this backend
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "60"))
+GEMINI_BURST = float(os.getenv("GEMINI_BURST", "10"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+
+# Image ingestion limits
+IMAGE_MAX_DIM = int(os.getenv("IMAGE_MAX_DIM", "1024"))  # longest side sent to the model
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))  # upload size limit
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+IMAGE_CAPTION_PROMPT = "Describe this image."
+
+# Response cache (in-memory LRU in front of SQLite)
+CACHE_DB = os.getenv("CACHE_DB", "chat_cache.db")
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "256"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Conversation sessions (in-memory LRU; set SESSION_DB to also persist them in SQLite)
+SESSION_DB = os.getenv("SESSION_DB", "")
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(24 * 3600)))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))  # recent turns sent verbatim
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "400"))  # compact memory of older turns
 
 # Validate API Key
-if not GEMINI_API_KEY:
+if not GEMINI_API_KEY and not GEMINI_BASE_URL:
     raise ValueError("Google Gemini API key is missing. Please set GEMINI_API_KEY in .env file.")
 
-# Configure Gemini AI
-genai.configure(api_key=GEMINI_API_KEY)
-
 # Initialize model with generation configuration
 generation_config = {
     "temperature": 2,
@@ -30,80 +63,299 @@ generation_config = {
     "response_mime_type": "text/plain",
 }
 
-try:
-    gemini_model = genai.GenerativeModel(
-        model_name="gemini-1.5-pro",
-        generation_config=generation_config,
+def create_transport():
+    if GEMINI_BASE_URL:
+        return RESTTransport(GEMINI_API_KEY or "fake-key", MODEL_NAME, rest_generation_config(generation_config),
+                             base_url=GEMINI_BASE_URL, max_connections=GEMINI_MAX_CONCURRENCY)
+    import google.generativeai as genai
+
+    # Configure Gemini AI
+    genai.configure(api_key=GEMINI_API_KEY)
+    try:
+        gemini_model = genai.GenerativeModel(
+            model_name=MODEL_NAME,
+            generation_config=generation_config,
+        )
+    except Exception as e:
+        raise ValueError(f"Error initializing Gemini model: {e}")
+    return SDKTransport(gemini_model, max_workers=GEMINI_MAX_CONCURRENCY)
+
+# One client (rate limiter, concurrency limit, connection/thread pool) for the whole process
+@asynccontextmanager
+async def lifespan(app):
+    app.state.gemini = AsyncGeminiClient(
+        create_transport(),
+        requests_per_minute=GEMINI_RPM,
+        burst=GEMINI_BURST,
+        max_concurrency=GEMINI_MAX_CONCURRENCY,
+        max_retries=GEMINI_MAX_RETRIES,
     )
-except Exception as e:
-    raise ValueError(f"Error initializing Gemini model: {e}")
+    app.state.cache = TieredCache(CACHE_DB, memory_entries=CACHE_MEMORY_ENTRIES, max_entries=CACHE_MAX_ENTRIES,
+                                  ttl_seconds=CACHE_TTL_SECONDS)
+    app.state.sessions = SessionStore(SESSION_DB or None, max_sessions=SESSION_MAX, ttl_seconds=SESSION_TTL_SECONDS,
+                                      history_budget=HISTORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET)
+    app.state.background = set()  # Strong references to running compactions
+    yield
+    await app.state.gemini.close()
 
 # Create FastAPI instance
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Define input schema
 class ChatRequest(BaseModel):
     user_input: str
-    image_input: str = None  # Optional base64 image
-
-def image_to_base64(image):
-    """Converts a PIL Image to a base64 encoded string."""
-    if image.mode == "RGBA":
-        image = image.convert("RGB")  # Convert RGBA to RGB to avoid JPEG errors
-    buffered = io.BytesIO()
-    image.save(buffered, format="JPEG")  # Ensure saving as JPEG
-    return base64.b64encode(buffered.getvalue()).decode()
-
-def send_message_with_retry(chat_session, message, max_retries=5):
-    """Handles retries with exponential backoff for rate limits."""
-    for attempt in range(max_retries):
-        try:
-            response = chat_session.send_message(message)
-            return response
-        except Exception as e:
-            if "429" in str(e):  # Rate limit error
-                wait_time = (2 ** attempt) + random.uniform(0, 2)
-                time.sleep(wait_time)
-            else:
-                raise e
-    raise Exception("Max retries exceeded after 5 attempts")
+    image_input: Optional[str] = None  # Optional base64 image
+    session_id: Optional[str] = None  # Omit to start a new conversation
+
+def log_image_metrics(metrics):
+    print(f"📊 Image: {metrics['upload_bytes'] / 1024:.0f} KB {metrics['source_format']} {metrics['source_size']} -> "
+          f"{metrics['output_bytes'] / 1024:.0f} KB {metrics['output_size']} | decode {metrics['decode_ms']} ms, "
+          f"encode {metrics['encode_ms']} ms")
+
+# ✅ **Sessions: bounded history + summarized memory**
+def text_request(session, user_input, metrics):
+    """Contents (summary + recent turns + new message) and the cache key for a text turn."""
+    history = app.state.sessions.context(session)
+    contents = history + [{"role": "user", "parts": [user_input]}]
+    # The same question means something else mid-conversation: key on the context too
+    context_digest = hashlib.sha1(json.dumps(history).encode("utf-8")).hexdigest() if history else None
+    key = content_key("text", MODEL_NAME, user_input, config=[generation_config, context_digest])
+    metrics["context_tokens"] = sum(estimate_tokens(part) for message in contents for part in message["parts"])
+    return contents, key
+
+async def finish_turn(session, user_input, has_image, response_text, metrics):
+    """Records the turn, persists the session and schedules compaction when history outgrows its budget."""
+    sessions = app.state.sessions
+    session.add_turn("user", user_input + (" [image attached]" if has_image else "") if user_input else "[image]")
+    session.add_turn("model", response_text)
+    await sessions.save(session)
+    if sessions.needs_compaction(session):
+        # Summarize in the background: the user already has their answer
+        task = asyncio.create_task(compact_session(session))
+        app.state.background.add(task)
+        task.add_done_callback(app.state.background.discard)
+    metrics["session"] = {"turns": len(session.turns), "history_tokens": session.to_dict()["history_tokens"],
+                          "has_summary": bool(session.summary)}
+
+async def compact_session(session):
+    try:
+        await app.state.sessions.compact(session, app.state.gemini.generate)
+    except Exception as e:
+        print(f"⚠️ Session {session.id}: summarization failed, keeping full history for now ({e})")
+
+async def cached_text(gemini, cache, session, user_input, metrics):
+    contents, key = text_request(session, user_input, metrics)
+    response, source = await cache.get_or_compute(key, "text", lambda: gemini.generate(contents))
+    metrics.setdefault("cache", {})["text"] = source
+    return response
+
+async def load_image(image_bytes, metrics):
+    """Returns (caption prompt parts, cache key) for an uploaded image."""
+    # Decode/downscale/encode is CPU work: keep it off the event loop
+    data, mime_type, image_metrics = await asyncio.to_thread(
+        prepare_image, image_bytes, IMAGE_MAX_DIM, IMAGE_MAX_BYTES, IMAGE_JPEG_QUALITY
+    )
+    metrics["image"] = image_metrics
+    log_image_metrics(image_metrics)
+    key = content_key("image", MODEL_NAME, IMAGE_CAPTION_PROMPT, image_metrics["content_hash"], generation_config)
+    return [IMAGE_CAPTION_PROMPT, image_part(data, mime_type)], key
+
+async def describe_image(gemini, cache, image_bytes, metrics):
+    try:
+        contents, key = await load_image(image_bytes, metrics)
+        # Generate image caption from a real image part (or reuse the caption of the same picture)
+        image_caption, source = await cache.get_or_compute(key, "image", lambda: gemini.generate(contents))
+        metrics.setdefault("cache", {})["image"] = source
+        return f"Image Caption (Gemini): {image_caption}"
+    except Exception as e:
+        return f"Error processing image: {e}"
+
+async def answer(user_input, image_bytes=None, metrics=None, session_id=None):
+    """Runs the text and image sub-requests concurrently and joins their answers."""
+    gemini, cache = app.state.gemini, app.state.cache
+    session = await app.state.sessions.get_or_create(session_id)
+    metrics = {} if metrics is None else metrics
+    text_task = cached_text(gemini, cache, session, user_input, metrics) if user_input else None
+    image_task = describe_image(gemini, cache, image_bytes, metrics) if image_bytes else None
+    tasks = [task for task in (text_task, image_task) if task is not None]
+
+    start_time = time.perf_counter()
+    try:
+        results = await asyncio.gather(*tasks)
+    except GeminiError as e:
+        status_code = 429 if e.status == 429 else 500
+        raise HTTPException(status_code=status_code, detail=f"Error processing request: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing request: {e}")
+    metrics["total_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+    response_text = "\n".join(results).strip()
+    await finish_turn(session, user_input, bool(image_bytes), response_text, metrics)
+    return {"response": response_text, "session_id": session.id, "metrics": metrics}
 
 @app.post("/chat")
 async def multimodal_chatbot(request: ChatRequest):
-    """Handles text and image inputs for the chatbot."""
-    user_input = request.user_input
-    image_input = request.image_input
-    text_response = ""
+    """Handles text and image inputs for the chatbot (JSON body, image as base64)."""
+    image_bytes = None
+    metrics = {}
+    if request.image_input:
+        metrics["payload_bytes"] = len(request.image_input)
+        try:
+            image_bytes = base64.b64decode(request.image_input)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid base64 image: {e}")
+        if len(image_bytes) > IMAGE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Image larger than {IMAGE_MAX_BYTES} bytes")
+    if not request.user_input and not image_bytes:
+        raise HTTPException(status_code=400, detail="Send a message, an image, or both.")
+    return await answer(request.user_input, image_bytes, metrics, request.session_id)
+
+async def read_upload(user_input, image, metrics):
+    """Reads a multipart image in chunks, stopping as soon as the size limit is exceeded."""
+    image_bytes = None
+    if image is not None:
+        chunks, size = [], 0
+        while chunk := await image.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > IMAGE_MAX_BYTES:
+                raise HTTPException(status_code=413, detail=f"Image larger than {IMAGE_MAX_BYTES} bytes")
+            chunks.append(chunk)
+        image_bytes = b"".join(chunks)
+        metrics["payload_bytes"] = size
+    if not user_input and not image_bytes:
+        raise HTTPException(status_code=400, detail="Send a message, an image, or both.")
+    return image_bytes
+
+@app.post("/chat/upload")
+async def multimodal_chatbot_upload(user_input: str = Form(""), image: Optional[UploadFile] = File(None),
+                                    session_id: Optional[str] = Form(None)):
+    """Multipart variant: the image arrives as raw bytes, no base64 on the way in."""
+    metrics = {}
+    image_bytes = await read_upload(user_input, image, metrics)
+    return await answer(user_input, image_bytes, metrics, session_id)
+
+# ✅ **Streaming (server-sent events)**
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
+async def stream_part(part, contents, key, emit, metrics):
+    """Streams one sub-request into the event queue, or replays its cached answer in one chunk."""
+    cache = app.state.cache
+    response, source = await cache.lookup(key)
+    if response is None:
+        cache.record_miss()
+        pieces = []
+        async for chunk in app.state.gemini.stream(contents):
+            pieces.append(chunk)
+            emit("chunk", {"part": part, "text": chunk})
+        # Only complete answers are cached; a cancelled stream never gets here
+        await cache.put(key, part, "".join(pieces))
+        source = "miss"
+    else:
+        emit("chunk", {"part": part, "text": response})
+    metrics.setdefault("cache", {})[part] = source
+
+async def stream_text(session, user_input, emit, metrics):
+    contents, key = text_request(session, user_input, metrics)
+    try:
+        await stream_part("text", contents, key, emit, metrics)
+    except GeminiError as e:
+        emit("error", {"part": "text", "status": e.status, "detail": f"Error processing request: {e}"})
+
+async def stream_image(image_bytes, emit, metrics):
     try:
-        # Handle text input
-        if user_input:
-            chat_session = gemini_model.start_chat(history=[])
-            response = send_message_with_retry(chat_session, user_input)
-            text_response = response.text
+        contents, key = await load_image(image_bytes, metrics)
+        await stream_part("image", contents, key, emit, metrics)
+    except Exception as e:
+        emit("error", {"part": "image", "detail": f"Error processing image: {e}"})
+
+async def chat_events(session, user_input, image_bytes, metrics):
+    """Merges the text and image streams into one SSE stream.
 
-        # Handle image input
-        if image_input:
-            try:
-                # Decode base64 image
-                image_bytes = base64.b64decode(image_input)
-                image = Image.open(io.BytesIO(image_bytes))
+    If the client disconnects, Starlette cancels this generator; the finally block
+    then cancels both sub-requests, which closes the upstream Gemini streams.
+    """
+    queue = asyncio.Queue()
+    emit = lambda event, data: queue.put_nowait((event, data))
+    producers = []
+    if user_input:
+        producers.append(stream_text(session, user_input, emit, metrics))
+    if image_bytes:
+        producers.append(stream_image(image_bytes, emit, metrics))
 
-                # Generate image caption
-                image_caption_prompt = f"Describe this image: {image_to_base64(image)}"
-                chat_session = gemini_model.start_chat(history=[])
-                image_caption_response = send_message_with_retry(chat_session, image_caption_prompt)
-                image_caption = image_caption_response.text
+    async def run(producer):
+        try:
+            await producer
+        except Exception as e:  # Anything the sub-request didn't turn into an error event itself
+            emit("error", {"detail": f"Error processing request: {e}"})
+        finally:
+            emit("end", None)
 
-                text_response += f"\nImage Caption (Gemini): {image_caption}"
+    start_time = time.perf_counter()
+    tasks = [asyncio.create_task(run(producer)) for producer in producers]
+    remaining, completed = len(tasks), False
+    answers = {"text": "", "image": ""}
+    failed = False
+    try:
+        yield sse("start", {"session_id": session.id,
+                            "parts": ["text"] * bool(user_input) + ["image"] * bool(image_bytes)})
+        while remaining:
+            event, data = await queue.get()
+            if event == "end":
+                remaining -= 1
+                continue
+            if event == "chunk":
+                answers[data["part"]] += data["text"]
+                metrics["chunks"] = metrics.get("chunks", 0) + 1
+                metrics.setdefault("ttft_ms", round((time.perf_counter() - start_time) * 1000, 2))
+            elif event == "error":
+                failed = True
+            yield sse(event, data)
+        metrics["total_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+        completed = True
+        # Same shape as the non-streaming answer; an abandoned, failed or empty stream records no turn
+        response_text = "\n".join(filter(None, [answers["text"],
+                                                 answers["image"] and f"Image Caption (Gemini): {answers['image']}"]))
+        if not failed and response_text:
+            await finish_turn(session, user_input, bool(image_bytes), response_text, metrics)
+        yield sse("done", {"metrics": metrics})
+    finally:
+        if not completed:
+            print("⚠️ Client disconnected: cancelling generation")
+        for task in tasks:
+            task.cancel()
+        # Starlette cancels us through an anyio scope that re-cancels every await;
+        # shield the cleanup so the upstream streams are really closed before we return
+        with anyio.CancelScope(shield=True):
+            await asyncio.gather(*tasks, return_exceptions=True)
 
-            except Exception as e:
-                text_response += f"\nError processing image: {e}"
+@app.post("/chat/stream")
+async def multimodal_chatbot_stream(user_input: str = Form(""), image: Optional[UploadFile] = File(None),
+                                    session_id: Optional[str] = Form(None)):
+    """Same inputs as /chat/upload; answers arrive as SSE `chunk` events, then `done` with metrics."""
+    metrics = {}
+    image_bytes = await read_upload(user_input, image, metrics)
+    session = await app.state.sessions.get_or_create(session_id)
+    return StreamingResponse(chat_events(session, user_input, image_bytes, metrics), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        return {"response": text_response.strip()}
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """Stored summary and turns of a conversation."""
+    session = await app.state.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session.")
+    return session.to_dict()
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing request: {e}")
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    await app.state.sessions.delete(session_id)
+    return {"deleted": session_id}
+
+@app.get("/stats")
+async def stats():
+    """Gemini client counters (calls, retries, throttling), cache hit rates per tier and session counts."""
+    return {"gemini": app.state.gemini.stats(), "cache": app.state.cache.stats(),
+            "sessions": app.state.sessions.stats()}
 
 # Run server if executed directly
 if __name__ == "__main__":
@@ -1,32 +1,44 @@
 import streamlit as st
 import requests
-import base64
-from PIL import Image
-import io
+import json
 
 BACKEND_URL = "http://localhost:8000"  # Adjust based on your backend deployment
 
 st.title("Multi-Modal Chatbot")
 st.write("This chatbot accepts text or image input and responds accordingly.")
 
+def read_events(response):
+    """Parses a server-sent event stream into (event, data) pairs."""
+    event, data = "message", []
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].strip())
+            elif not line and data:
+                yield event, json.loads("\n".join(data))
+                event, data = "message", []
+    finally:
+        response.close()
+
+# Conversation state: the backend keeps the history, we only keep the session id and a transcript to display
+if "session_id" not in st.session_state:
+    st.session_state.session_id = None
+    st.session_state.transcript = []
+
+if st.button("New conversation"):
+    st.session_state.session_id = None
+    st.session_state.transcript = []
+
+for role, message in st.session_state.transcript:
+    with st.chat_message(role):
+        st.markdown(message)
+
 # Text input
 user_input = st.text_area("Enter your message:")
 
-# Image input
-def to_image(uploaded_file):
-    if uploaded_file is not None:
-        try:
-            # Open the image in memory to avoid reading it multiple times
-            image = Image.open(uploaded_file)
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")  # Ensure saving as PNG
-            image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
-            return image_base64
-        except Exception as e:
-            st.error(f"Error processing image: {e}")
-            return None
-    return None
-
+# Image input (sent as raw bytes; the backend downscales and encodes it once)
 uploaded_file = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
 
 # Handle sending the request to backend
@@ -34,18 +46,58 @@ if st.button("Send"):
     if not user_input and not uploaded_file:
         st.warning("Please enter a message or upload an image.")
     else:
-        # Convert image to base64 if available
-        image_base64 = to_image(uploaded_file)
-        
-        # Prepare data for the backend
-        data = {"user_input": user_input, "image_input": image_base64}
-        
-        with st.spinner("Sending request to chatbot..."):
-            response = requests.post(f"{BACKEND_URL}/chat", json=data)
-        
+        # Multipart upload: no PNG re-save and no base64 inflation on the way to the backend
+        files = None
+        if uploaded_file is not None:
+            files = {"image": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
+        data = {"user_input": user_input}
+        if st.session_state.session_id:
+            data["session_id"] = st.session_state.session_id
+
+        # Stream the answer: chunks are rendered as they arrive. Stopping the app or
+        # starting a new request closes the connection, which cancels the generation
+        response = requests.post(f"{BACKEND_URL}/chat/stream", data=data, files=files, stream=True)
+
         # Handle the response
         if response.status_code == 200:
             st.write("### Chatbot Response:")
-            st.write(response.json()["response"])
+            placeholders = {"text": st.empty(), "image": st.empty()}
+            answers = {"text": "", "image": ""}
+            result = {}
+            for event, payload in read_events(response):
+                if event == "start":
+                    st.session_state.session_id = payload["session_id"]
+                elif event == "chunk":
+                    answers[payload["part"]] += payload["text"]
+                    prefix = "Image Caption (Gemini): " if payload["part"] == "image" else ""
+                    placeholders[payload["part"]].markdown(prefix + answers[payload["part"]] + "▌")
+                elif event == "error":
+                    answers[payload["part"]] = ""
+                    placeholders[payload["part"]].error(payload["detail"])
+                elif event == "done":
+                    result = payload
+            for part, answer in answers.items():
+                if answer:
+                    prefix = "Image Caption (Gemini): " if part == "image" else ""
+                    placeholders[part].markdown(prefix + answer)
+            if result:
+                reply = "\n\n".join(filter(None, [answers["text"],
+                                                   answers["image"] and f"Image Caption (Gemini): {answers['image']}"]))
+                st.session_state.transcript.append(("user", user_input or "[image]"))
+                st.session_state.transcript.append(("assistant", reply))
+
+            image_metrics = result.get("metrics", {}).get("image")
+            if image_metrics:
+                st.caption(
+                    f"Image: {image_metrics['upload_bytes'] / 1024:.0f} KB uploaded, "
+                    f"{image_metrics['output_bytes'] / 1024:.0f} KB sent to Gemini "
+                    f"({image_metrics['output_size'][0]}x{image_metrics['output_size'][1]}) | "
+                    f"decode {image_metrics['decode_ms']} ms, encode {image_metrics['encode_ms']} ms"
+                )
+            if "ttft_ms" in result.get("metrics", {}):
+                st.caption(f"First chunk after {result['metrics']['ttft_ms']:.0f} ms, "
+                           f"complete after {result['metrics']['total_ms']:.0f} ms")
+        elif response.status_code == 413:
+            st.error("Image is too large. Please upload a smaller file.")
         else:
             st.error("Error communicating with backend.")
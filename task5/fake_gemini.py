@@ -0,0 +1,82 @@
+import json
+import asyncio
+import random
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+# ✅ **Local Fake Gemini Server (for load and retry testing)**
+# Speaks the generateContent / streamGenerateContent (SSE) REST shapes, adds a
+# configurable latency and answers a share of requests with 429, so the backend
+# can be exercised without an API key (/stats counts cancelled streams):
+#   python fake_gemini.py --port 8001 --latency 0.5 --rate-limit 0.2
+#   GEMINI_BASE_URL=http://localhost:8001 python Backend.py
+app = FastAPI()
+settings = {"latency": 0.5, "rate_limit": 0.0, "chunk_delay": 0.05, "stream_words": 60}
+counters = {"requests": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0,
+            "streams": 0, "streams_cancelled": 0, "last_request_bytes": 0, "max_request_bytes": 0}
+
+
+async def stream_words(reply):
+    """SSE chunks of a few words each; notices when the client goes away."""
+    words = reply.split(" ")
+    counters["streams"] += 1
+    try:
+        for start in range(0, len(words), 3):
+            await asyncio.sleep(settings["chunk_delay"])
+            chunk = " ".join(words[start:start + 3]) + " "
+            payload = {"candidates": [{"content": {"role": "model", "parts": [{"text": chunk}]}}]}
+            yield f"data: {json.dumps(payload)}\r\n\r\n"
+    except (asyncio.CancelledError, GeneratorExit):
+        counters["streams_cancelled"] += 1
+        raise
+
+
+@app.post("/v1beta/models/{model_action}")
+async def generate_content(model_action: str, request: Request):
+    counters["requests"] += 1
+    if random.random() < settings["rate_limit"]:
+        counters["rate_limited"] += 1
+        return JSONResponse({"error": {"code": 429, "message": "Resource has been exhausted"}}, status_code=429)
+
+    raw = await request.body()
+    counters["last_request_bytes"] = len(raw)
+    counters["max_request_bytes"] = max(counters["max_request_bytes"], len(raw))
+    body = json.loads(raw)
+    parts = body["contents"][-1]["parts"]
+    text = " ".join(part.get("text", "")[:80] for part in parts if "text" in part)
+    images = sum(1 for part in parts if "inline_data" in part or "inlineData" in part)
+
+    counters["in_flight"] += 1
+    counters["max_in_flight"] = max(counters["max_in_flight"], counters["in_flight"])
+    try:
+        await asyncio.sleep(settings["latency"])
+    finally:
+        counters["in_flight"] -= 1
+
+    reply = f"[fake {model_action.split(':')[0]}, {len(body['contents'])} message(s)] {text}"
+    if images:
+        reply += f" ({images} image part(s))"
+    if model_action.endswith(":streamGenerateContent"):
+        reply += " " + " ".join(f"word{i}" for i in range(settings["stream_words"]))
+        return StreamingResponse(stream_words(reply), media_type="text/event-stream")
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": reply}]}, "finishReason": "STOP"}]}
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini generateContent server.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per response")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="Seconds between streamed chunks")
+    parser.add_argument("--stream-words", type=int, default=60, help="Filler words appended to streamed replies")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, rate_limit=args.rate_limit, chunk_delay=args.chunk_delay,
+                    stream_words=args.stream_words)
+    uvicorn.run(app, host="127.0.0.1", port=args.port)
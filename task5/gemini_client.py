@@ -0,0 +1,281 @@
+import json
+import time
+import base64
+import random
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ✅ **Non-blocking Gemini Client**
+# Every model call goes through one shared client:
+#   - a token bucket caps requests per minute across all users,
+#   - a semaphore caps how many calls are in flight at once,
+#   - retries back off with asyncio.sleep + jitter, so a rate-limited request
+#     never blocks the event loop for everyone else.
+# Two transports: the google-generativeai SDK (blocking, run in a bounded thread
+# pool) or the REST API over httpx (native async; also used for a local fake server).
+# Both can stream; closing a stream early stops the generation upstream.
+RETRYABLE_STATUS = {429, 500, 503, 504}
+
+
+class GeminiError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+    @property
+    def retryable(self):
+        return self.status in RETRYABLE_STATUS
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts of up to `capacity` (default: 5 seconds' worth)."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(5.0, 5 * rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits for a token; returns how long the caller was throttled (seconds)."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class SDKTransport:
+    """google-generativeai model; its blocking calls run in a bounded thread pool."""
+
+    def __init__(self, model, max_workers=8):
+        self.model = model
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini")
+
+    @staticmethod
+    def _error(e):
+        from google.api_core import exceptions as google_exceptions
+
+        if isinstance(e, google_exceptions.GoogleAPICallError):
+            return GeminiError(str(e), getattr(e, "code", None))
+        return GeminiError(str(e), 429 if "429" in str(e) else None)
+
+    def _generate(self, contents):
+        try:
+            return self.model.generate_content(contents).text
+        except Exception as e:
+            raise self._error(e) from e
+
+    def _stream(self, contents, loop, queue, cancelled):
+        """Worker thread: pushes chunks to the event loop until done or cancelled."""
+        try:
+            response = self.model.generate_content(contents, stream=True)
+            for chunk in response:
+                if cancelled.is_set():
+                    break  # Abandoning the iterator closes the HTTP stream
+                if chunk.parts:
+                    loop.call_soon_threadsafe(queue.put_nowait, ("chunk", chunk.text))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, ("error", self._error(e)))
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, ("end", None))
+
+    async def generate(self, contents):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._generate, contents)
+
+    async def stream(self, contents):
+        loop = asyncio.get_running_loop()
+        queue, cancelled = asyncio.Queue(), threading.Event()
+        loop.run_in_executor(self.executor, self._stream, contents, loop, queue, cancelled)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            cancelled.set()
+
+    async def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class RESTTransport:
+    """Gemini REST API (generateContent) over an async httpx connection pool."""
+
+    def __init__(self, api_key, model_name, generation_config=None, base_url="https://generativelanguage.googleapis.com",
+                 max_connections=8, timeout=120):
+        import httpx
+
+        self.api_key = api_key
+        self.model_name = model_name
+        self.generation_config = {k: v for k, v in (generation_config or {}).items()
+                                  if k in ("temperature", "topP", "topK", "maxOutputTokens", "responseMimeType")}
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    @staticmethod
+    def _part(item):
+        if isinstance(item, str):
+            return {"text": item}
+        if "data" in item:  # image_part() -> inline_data, base64 only at the wire
+            return {"inline_data": {"mime_type": item["mime_type"], "data": base64.b64encode(item["data"]).decode()}}
+        return item  # Already a REST part
+
+    def _body(self, contents):
+        messages = contents if is_conversation(contents) else [{"role": "user", "parts": contents}]
+        body = {"contents": [{"role": message["role"], "parts": [self._part(item) for item in message["parts"]]}
+                             for message in messages]}
+        if self.generation_config:
+            body["generationConfig"] = self.generation_config
+        return body
+
+    @staticmethod
+    def _text(payload):
+        return "".join(part.get("text", "") for part in payload["candidates"][0]["content"]["parts"])
+
+    async def generate(self, contents):
+        import httpx
+
+        try:
+            response = await self.client.post(f"/v1beta/models/{self.model_name}:generateContent",
+                                              params={"key": self.api_key}, json=self._body(contents))
+        except httpx.TransportError as e:
+            raise GeminiError(f"Connection error: {e}", 503) from e
+        if response.status_code != 200:
+            raise GeminiError(f"{response.status_code} {response.text[:200]}", response.status_code)
+        try:
+            return self._text(response.json())
+        except (KeyError, IndexError, ValueError) as e:
+            raise GeminiError(f"Unexpected response: {response.text[:200]}") from e
+
+    async def stream(self, contents):
+        """streamGenerateContent as server-sent events; leaving early closes the connection."""
+        import httpx
+
+        try:
+            async with self.client.stream("POST", f"/v1beta/models/{self.model_name}:streamGenerateContent",
+                                          params={"key": self.api_key, "alt": "sse"},
+                                          json=self._body(contents)) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise GeminiError(f"{response.status_code} {response.text[:200]}", response.status_code)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    try:
+                        text = self._text(json.loads(line[5:]))
+                    except (KeyError, IndexError, ValueError):
+                        continue  # e.g. a final chunk carrying only finishReason/usage
+                    if text:
+                        yield text
+        except httpx.TransportError as e:
+            raise GeminiError(f"Connection error: {e}", 503) from e
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def is_conversation(contents):
+    """True for a list of {"role", "parts"} messages, False for the parts of a single user message."""
+    return bool(contents) and isinstance(contents[0], dict) and "role" in contents[0]
+
+
+def image_part(data, mime_type="image/jpeg"):
+    """An inline image part (raw bytes) accepted by both transports."""
+    return {"mime_type": mime_type, "data": data}
+
+
+def rest_generation_config(generation_config):
+    """Maps the SDK's snake_case generation config to the REST API's camelCase keys."""
+    names = {"top_p": "topP", "top_k": "topK", "max_output_tokens": "maxOutputTokens",
+             "response_mime_type": "responseMimeType"}
+    return {names.get(key, key): value for key, value in generation_config.items()}
+
+
+class AsyncGeminiClient:
+    def __init__(self, transport, requests_per_minute=60, burst=None, max_concurrency=8,
+                 max_retries=5, base_delay=1.0, max_delay=32.0):
+        self.transport = transport
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "cancelled": 0, "throttled_seconds": 0.0, "backoff_seconds": 0.0}
+
+    def backoff(self, attempt):
+        """Exponential backoff with full jitter: uniform(0, min(max_delay, base * 2^attempt))."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def generate(self, contents):
+        """Sends one prompt (a string, a list of parts, or a list of role/parts messages) and returns the text."""
+        if isinstance(contents, str):
+            contents = [contents]
+        for attempt in range(self.max_retries + 1):
+            self.counters["throttled_seconds"] += await self.bucket.acquire()
+            self.counters["calls"] += 1
+            try:
+                async with self.semaphore:
+                    return await self.transport.generate(contents)
+            except GeminiError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                delay = self.backoff(attempt)
+                self.counters["retries"] += 1
+                self.counters["backoff_seconds"] += delay
+                await asyncio.sleep(delay)
+
+    async def stream(self, contents):
+        """Yields response text chunks as they arrive.
+
+        Retries only before the first chunk; once text has been sent it cannot be taken back.
+        """
+        if isinstance(contents, str):
+            contents = [contents]
+        for attempt in range(self.max_retries + 1):
+            self.counters["throttled_seconds"] += await self.bucket.acquire()
+            self.counters["calls"] += 1
+            started = False
+            chunks = self.transport.stream(contents)
+            try:
+                async with self.semaphore:
+                    async for chunk in chunks:
+                        started = True
+                        yield chunk
+                return
+            except GeminiError as e:
+                if started or not e.retryable or attempt == self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                delay = self.backoff(attempt)
+                self.counters["retries"] += 1
+                self.counters["backoff_seconds"] += delay
+            except (asyncio.CancelledError, GeneratorExit):
+                self.counters["cancelled"] += 1
+                raise
+            finally:
+                await chunks.aclose()  # Stop the upstream generation right away
+            await asyncio.sleep(delay)
+
+    def stats(self):
+        return {**self.counters, "tokens_available": round(self.bucket.tokens, 2)}
+
+    async def close(self):
+        await self.transport.close()
@@ -0,0 +1,54 @@
+import io
+import time
+import hashlib
+from PIL import Image
+
+# ✅ **Image Ingestion: decode once, downscale, encode once**
+# JPEGs are decoded at reduced scale with Image.draft (the DCT skips detail we
+# would throw away), then thumbnail() caps the longest side. An upload that is
+# already a small enough JPEG is forwarded byte-for-byte with no re-encode.
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def content_hash(data):
+    """SHA-256 of the image bytes sent to the model: the caption cache only reuses exact matches."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare_image(data, max_dim=1024, max_bytes=10 * 1024 * 1024, quality=85):
+    """Turns uploaded bytes into (image bytes, mime type, metrics) ready to send as an image part."""
+    if len(data) > max_bytes:
+        raise ImageTooLarge(f"Image is {len(data) / 1e6:.1f} MB, the limit is {max_bytes / 1e6:.1f} MB")
+
+    start_time = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    source_format, source_size = image.format, image.size
+    metrics = {"upload_bytes": len(data), "source_format": source_format, "source_size": list(source_size)}
+
+    if max(source_size) <= max_dim and source_format in PASSTHROUGH_FORMATS:
+        metrics["content_hash"] = content_hash(data)
+        metrics.update(output_bytes=len(data), output_size=list(source_size), reencoded=False,
+                       decode_ms=round((time.perf_counter() - start_time) * 1000, 2), encode_ms=0.0)
+        return data, PASSTHROUGH_FORMATS[source_format], metrics
+
+    # JPEG only: decode directly at 1/2, 1/4 or 1/8 scale when that still covers max_dim
+    image.draft("RGB", (max_dim, max_dim))
+    image.thumbnail((max_dim, max_dim))
+    if image.mode != "RGB":
+        image = image.convert("RGB")  # JPEG has no alpha/palette
+    decode_ms = (time.perf_counter() - start_time) * 1000
+
+    start_time = time.perf_counter()
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality, optimize=True)
+    encode_ms = (time.perf_counter() - start_time) * 1000
+
+    output = buffered.getvalue()
+    metrics["content_hash"] = content_hash(output)
+    metrics.update(output_bytes=len(output), output_size=list(image.size), reencoded=True,
+                   decode_ms=round(decode_ms, 2), encode_ms=round(encode_ms, 2))
+    return output, "image/jpeg", metrics
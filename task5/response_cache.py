@@ -0,0 +1,176 @@
+import re
+import time
+import json
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ✅ **Content-addressed Response Cache**
+# Keys are hashes of what the model actually sees: the normalized prompt, plus a
+# SHA-256 of the prepared image bytes for captions. Only exact hits are served:
+# a different picture never gets another picture's caption. A small in-memory
+# LRU sits in front of a SQLite store that survives restarts; both expire
+# entries after a TTL.
+# Concurrent misses for the same key share one Gemini call.
+
+
+def normalize_prompt(prompt):
+    return re.sub(r"\s+", " ", (prompt or "").strip().lower())
+
+
+def content_key(kind, model, prompt, image_hash=None, config=None):
+    raw = json.dumps([kind, model, normalize_prompt(prompt), image_hash, config], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TieredCache:
+    def __init__(self, db_path="chat_cache.db", memory_entries=256, max_entries=10000, ttl_seconds=24 * 3600):
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (response, created)
+        self._inflight = {}  # key -> asyncio.Future shared by concurrent misses
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0,
+                         "saved_calls": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+            self._conn.commit()
+
+    # In-memory LRU front
+    def _memory_get(self, key, now):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        if self.ttl_seconds and now - entry[1] > self.ttl_seconds:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return entry[0]
+
+    def _memory_put(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # SQLite back (called from a worker thread)
+    def _disk_get(self, key, now):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row
+
+    def _disk_put(self, key, kind, response, now):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, kind, response, created, last_access) "
+                               "VALUES (?, ?, ?, ?, ?)", (key, kind, response, now, now))
+            if self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+            # Least recently used rows beyond the cap
+            self._conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    async def get(self, key):
+        """Returns (response, tier) with tier "memory" or "disk", or (None, None) on a miss."""
+        now = time.time()
+        response = self._memory_get(key, now)
+        if response is not None:
+            self.counters["memory_hits"] += 1
+            return response, "memory"
+        row = await asyncio.to_thread(self._disk_get, key, now)
+        if row is not None:
+            self._memory_put(key, row[0], row[1])  # Promote to the memory tier
+            self.counters["disk_hits"] += 1
+            return row[0], "disk"
+        return None, None
+
+    async def put(self, key, kind, response):
+        now = time.time()
+        self._memory_put(key, response, now)
+        await asyncio.to_thread(self._disk_put, key, kind, response, now)
+
+    async def lookup(self, key):
+        """Exact lookup; returns (response, source) with source "memory" or "disk", or (None, None).
+
+        Misses are not counted here; whoever computes the answer records it.
+        """
+        response, tier = await self.get(key)
+        if response is not None:
+            self.counters["saved_calls"] += 1
+        return response, tier
+
+    def record_miss(self):
+        self.counters["misses"] += 1
+
+    async def get_or_compute(self, key, kind, compute):
+        """Cached response for key, else awaits compute() once, even if many callers miss at the same time.
+
+        Returns (response, source) where source is "memory", "disk", "coalesced" or "miss".
+        """
+        response, source = await self.lookup(key)
+        if response is not None:
+            return response, source
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.counters["coalesced"] += 1
+            self.counters["saved_calls"] += 1
+            return await asyncio.shield(inflight), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.record_miss()
+        try:
+            response = await compute()
+            await self.put(key, kind, response)
+            future.set_result(response)
+            return response, "miss"
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved: waiters (if any) re-raise it themselves
+            raise
+        finally:
+            del self._inflight[key]
+
+    @property
+    def hit_rate(self):
+        hits = self.counters["saved_calls"]
+        total = hits + self.counters["misses"]
+        return hits / total if total else 0.0
+
+    def stats(self):
+        entries = 0
+        if self._conn is not None:
+            with self._lock:
+                entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {**self.counters, "hit_rate": round(self.hit_rate, 4),
+                "memory_entries": len(self._memory), "disk_entries": entries}
@@ -0,0 +1,191 @@
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# ✅ **Multi-turn Sessions with a Bounded Context**
+# Each session keeps its recent turns verbatim plus a compact summary of older
+# ones. A request only carries the summary and the newest turns that fit the
+# token budget, so its size stays flat however long the conversation gets.
+# Turns that no longer fit are folded into the summary in the background.
+# Sessions live in an in-memory LRU; with a db_path they are also written to
+# SQLite and reloaded after eviction or a restart.
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an assistant. "
+    "Keep facts, names, numbers, preferences and open questions; drop small talk. "
+    "Answer with the new summary only, in at most {max_words} words.\n\n"
+    "Current summary:\n{summary}\n\nNew turns:\n{turns}"
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) without loading a tokenizer."""
+    return max(1, len(text) // 4)
+
+
+class Session:
+    def __init__(self, session_id, turns=None, summary="", updated=None):
+        self.id = session_id
+        self.turns = turns or []  # [{"role": "user"|"model", "text": ..., "tokens": n}]
+        self.summary = summary
+        self.updated = updated or time.time()
+        self.lock = asyncio.Lock()  # One compaction at a time per session
+
+    def add_turn(self, role, text):
+        self.turns.append({"role": role, "text": text, "tokens": estimate_tokens(text)})
+        self.updated = time.time()
+
+    def window(self, budget):
+        """Index of the oldest turn that still fits in `budget` tokens (newest turns first)."""
+        used, start = 0, len(self.turns)
+        for i in range(len(self.turns) - 1, -1, -1):
+            used += self.turns[i]["tokens"]
+            if used > budget:
+                break
+            start = i
+        # Start on a user turn so the model never sees a reply without its question
+        while start < len(self.turns) and self.turns[start]["role"] != "user":
+            start += 1
+        return start
+
+    def to_dict(self):
+        return {"session_id": self.id, "summary": self.summary, "turns": self.turns, "updated": self.updated,
+                "history_tokens": sum(turn["tokens"] for turn in self.turns),
+                "summary_tokens": estimate_tokens(self.summary) if self.summary else 0}
+
+
+class SessionStore:
+    def __init__(self, db_path=None, max_sessions=1000, ttl_seconds=24 * 3600,
+                 history_budget=2000, summary_budget=400):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self._sessions = OrderedDict()
+        self.counters = {"created": 0, "loaded": 0, "evicted": 0, "compactions": 0, "compacted_turns": 0}
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    turns TEXT NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+
+    # SQLite persistence (called from a worker thread)
+    def _load(self, session_id):
+        if self._conn is None:
+            return None
+        with self._lock:
+            row = self._conn.execute("SELECT summary, turns, updated FROM sessions WHERE id = ?",
+                                     (session_id,)).fetchone()
+        if row is None:
+            return None
+        return Session(session_id, json.loads(row[1]), row[0], row[2])
+
+    def _save(self, session_id, summary, turns, updated):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                               (session_id, summary, turns, updated))
+            if self.ttl_seconds:
+                self._conn.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+
+    def _delete(self, session_id):
+        if self._conn is None:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+
+    def _remember(self, session):
+        self._sessions[session.id] = session
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)  # Still in SQLite (if enabled)
+            self.counters["evicted"] += 1
+
+    def _expired(self, session):
+        return self.ttl_seconds and time.time() - session.updated > self.ttl_seconds
+
+    async def get(self, session_id):
+        """The session for session_id, or None if it does not exist or has expired."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = await asyncio.to_thread(self._load, session_id)
+            if session is not None:
+                self.counters["loaded"] += 1
+        if session is None or self._expired(session):
+            return None
+        self._remember(session)
+        return session
+
+    async def get_or_create(self, session_id=None):
+        session = await self.get(session_id) if session_id else None
+        if session is None:
+            session = Session(session_id or uuid.uuid4().hex)
+            self.counters["created"] += 1
+            self._remember(session)
+        return session
+
+    async def save(self, session):
+        await asyncio.to_thread(self._save, session.id, session.summary, json.dumps(session.turns), session.updated)
+
+    async def delete(self, session_id):
+        self._sessions.pop(session_id, None)
+        await asyncio.to_thread(self._delete, session_id)
+
+    def context(self, session):
+        """Summary plus the newest turns within the history budget, as a list of messages."""
+        messages = []
+        if session.summary:
+            messages.append({"role": "user", "parts": [f"Summary of our conversation so far: {session.summary}"]})
+            messages.append({"role": "model", "parts": ["Understood, I will keep that in mind."]})
+        for turn in session.turns[session.window(self.history_budget):]:
+            messages.append({"role": turn["role"], "parts": [turn["text"]]})
+        return messages
+
+    def needs_compaction(self, session):
+        return session.window(self.history_budget) > 0
+
+    async def compact(self, session, summarize):
+        """Folds the turns that fell out of the window into the summary via `summarize(prompt)`.
+
+        The recent half of the budget is kept verbatim, so the next few requests
+        don't immediately trigger another compaction.
+        """
+        async with session.lock:
+            cut = session.window(self.history_budget // 2)
+            if cut == 0:
+                return
+            old_turns = session.turns[:cut]
+            prompt = SUMMARY_PROMPT.format(
+                max_words=int(self.summary_budget * 0.75),
+                summary=session.summary or "(none yet)",
+                turns="\n".join(f"{turn['role'].title()}: {turn['text']}" for turn in old_turns),
+            )
+            summary = (await summarize(prompt)).strip()
+            # Hard cap in case the model ignores the length limit
+            session.summary = summary[:self.summary_budget * 4]
+            # Only drop the turns that were summarized; new ones may have arrived meanwhile
+            del session.turns[:cut]
+            self.counters["compactions"] += 1
+            self.counters["compacted_turns"] += len(old_turns)
+            await self.save(session)
+
+    def stats(self):
+        persisted = 0
+        if self._conn is not None:
+            with self._lock:
+                persisted = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {**self.counters, "in_memory": len(self._sessions), "persisted": persisted}
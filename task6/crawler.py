@@ -0,0 +1,184 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from urllib.parse import urlsplit
+import httpx
+from bs4 import BeautifulSoup
+
+# ✅ **Async Crawler with Conditional GETs and Paragraph Dedup**
+# All sources are fetched concurrently through one pooled httpx client, with a
+# per-host cap so no single site gets hammered. Each page's ETag/Last-Modified
+# is remembered and sent back (If-None-Match / If-Modified-Since), so unchanged
+# pages come back as a bodyless 304. Paragraphs are fingerprinted (hash of the
+# normalised text) and only ones never seen before are returned as `new`, which
+# is what the model trains on. Sources and crawl settings live in a JSON
+# registry (sources.json); validators and fingerprints in a JSON state file.
+DEFAULT_SETTINGS = {"interval_seconds": 1800, "per_host_limit": 2, "max_connections": 10, "timeout": 10,
+                    "max_fingerprints": 200000}
+USER_AGENT = "KnowledgeBot/1.0 (+task6 chatbot)"
+
+
+def load_registry(path):
+    """Settings plus the enabled source URLs from a registry file."""
+    with open(path, "r", encoding="utf-8") as registry_file:
+        registry = json.load(registry_file)
+    settings = {**DEFAULT_SETTINGS, **{k: v for k, v in registry.items() if k != "sources"}}
+    urls = [source["url"] for source in registry.get("sources", []) if source.get("enabled", True)]
+    return settings, urls
+
+
+def extract_paragraphs(html, min_words=6):
+    """Text of the page's <p> tags with more than five words, duplicates within the page removed."""
+    soup = BeautifulSoup(html, "html.parser")
+    paragraphs = [re.sub(r"\s+", " ", p.get_text()).strip() for p in soup.find_all("p")]
+    return list(dict.fromkeys(p for p in paragraphs if len(p.split()) >= min_words))
+
+
+def fingerprint(paragraph):
+    normalized = re.sub(r"[^\w]+", " ", paragraph.lower()).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class Crawler:
+    def __init__(self, urls, state_path="crawl_state.json", per_host_limit=2, max_connections=10, timeout=10,
+                 max_fingerprints=200000, **_):
+        self.urls = urls
+        self.state_path = state_path
+        self.per_host_limit = per_host_limit
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_fingerprints = max_fingerprints
+        self.pages = {}  # url -> {"etag", "last_modified", "digest", "paragraphs"}
+        self.seen = {}  # fingerprint -> None, oldest first
+        self.counters = {"requests": 0, "not_modified": 0, "unchanged": 0, "changed": 0, "errors": 0,
+                         "bytes": 0, "paragraphs": 0, "new_paragraphs": 0}
+        self._host_limits = {}
+        self.client = None
+        self.load_state()
+
+    @classmethod
+    def from_registry(cls, registry_path, state_path="crawl_state.json"):
+        settings, urls = load_registry(registry_path)
+        return cls(urls, state_path, **settings), settings
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout, follow_redirects=True, headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+        self.client = None
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch(self, url):
+        """One conditional GET. Returns {"url", "status", "paragraphs", "new", "bytes", "ms"}.
+
+        status is "changed", "unchanged" (200 with identical content), "not_modified" (304) or "error";
+        `paragraphs` is the page's full text (only when changed), `new` the never-seen paragraphs in it.
+        """
+        page = self.pages.get(url, {})
+        headers = {}
+        if page.get("etag"):
+            headers["If-None-Match"] = page["etag"]
+        if page.get("last_modified"):
+            headers["If-Modified-Since"] = page["last_modified"]
+        result = {"url": url, "status": "error", "paragraphs": [], "new": [], "bytes": 0, "ms": 0.0}
+
+        start = time.perf_counter()
+        try:
+            async with self._host_limit(url):
+                self.counters["requests"] += 1
+                response = await self.client.get(url, headers=headers)
+            result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+            if response.status_code == 304:
+                self.counters["not_modified"] += 1
+                result["status"] = "not_modified"
+                return result
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            self.counters["errors"] += 1
+            print(f"❌ Error fetching {url}: {e}")
+            return result
+
+        result["bytes"] = len(response.content)
+        self.counters["bytes"] += len(response.content)
+        digest = hashlib.blake2b(response.content, digest_size=16).hexdigest()
+        self.pages[url] = {"etag": response.headers.get("etag"), "last_modified": response.headers.get("last-modified"),
+                           "digest": digest, "paragraphs": page.get("paragraphs", 0)}
+        if digest == page.get("digest"):  # Server ignores validators but nothing changed
+            self.counters["unchanged"] += 1
+            result["status"] = "unchanged"
+            return result
+
+        # Parsing is CPU work; keep it off the event loop so other downloads progress
+        paragraphs = await asyncio.to_thread(extract_paragraphs, response.text)
+        new = []
+        for paragraph in paragraphs:
+            key = fingerprint(paragraph)
+            if key not in self.seen:
+                self.seen[key] = None
+                new.append(paragraph)
+        self.pages[url]["paragraphs"] = len(paragraphs)
+        self.counters["changed"] += 1
+        self.counters["paragraphs"] += len(paragraphs)
+        self.counters["new_paragraphs"] += len(new)
+        result.update(status="changed", paragraphs=paragraphs, new=new)
+        return result
+
+    async def crawl(self, urls=None):
+        """Fetches every source concurrently. Call save_state() once the results are safely applied."""
+        return await asyncio.gather(*(self.fetch(url) for url in (urls or self.urls)))
+
+    def load_state(self):
+        """Validators and fingerprints as last saved (also used to roll back a round that failed)."""
+        self.pages, self.seen = {}, {}
+        if self.state_path and os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                state = json.load(state_file)
+            self.pages = state.get("pages", {})
+            self.seen = dict.fromkeys(state.get("seen", []))
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        # Forget the oldest fingerprints beyond the cap
+        for key in list(self.seen)[:max(0, len(self.seen) - self.max_fingerprints)]:
+            del self.seen[key]
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump({"pages": self.pages, "seen": list(self.seen)}, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def stats(self):
+        return {**self.counters, "sources": len(self.urls), "fingerprints": len(self.seen)}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Crawl the registered sources once and report what changed.")
+    parser.add_argument("--sources", default="sources.json", help="Source registry file")
+    parser.add_argument("--state", default="crawl_state.json", help="Validators/fingerprints file")
+    args = parser.parse_args()
+
+    async def crawl_once():
+        crawler, _ = Crawler.from_registry(args.sources, args.state)
+        async with crawler:
+            for result in await crawler.crawl():
+                print(f"{result['status']:>12}  {len(result['new']):>4} new / {len(result['paragraphs']):>4}  "
+                      f"{result['ms']:>7} ms  {result['url']}")
+            crawler.save_state()
+        print(f"📊 {crawler.stats()}")
+
+    asyncio.run(crawl_once())
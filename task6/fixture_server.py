@@ -0,0 +1,71 @@
+import os
+import time
+import json
+import hashlib
+import argparse
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ✅ **Offline HTTP Fixture Server (for crawler testing)**
+# Serves the HTML files in a folder with ETag and Last-Modified headers and
+# answers conditional requests with 304, so the crawler can be exercised without
+# the network. Edit a file to simulate a site update; /stats counts responses.
+#   python fixture_server.py --port 8002 --dir fixtures
+#   python crawler.py --sources fixtures/sources.json --state /tmp/crawl_state.json
+counters = {"requests": 0, "ok": 0, "not_modified": 0, "not_found": 0}
+settings = {"dir": "fixtures", "latency": 0.0, "validators": True}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, json.dumps(counters).encode("utf-8"), {"Content-Type": "application/json"})
+            return
+        counters["requests"] += 1
+        time.sleep(settings["latency"])
+        name = os.path.basename(self.path.split("?")[0]) or "index.html"
+        path = os.path.join(settings["dir"], name)
+        if not name.endswith(".html") or not os.path.isfile(path):
+            counters["not_found"] += 1
+            self._send(404)
+            return
+
+        with open(path, "rb") as page_file:
+            body = page_file.read()
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if settings["validators"]:
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            mtime = int(os.path.getmtime(path))
+            headers.update({"ETag": etag, "Last-Modified": formatdate(mtime, usegmt=True)})
+            since = self.headers.get("If-Modified-Since")
+            if self.headers.get("If-None-Match") == etag or (
+                    not self.headers.get("If-None-Match") and since
+                    and parsedate_to_datetime(since).timestamp() >= mtime):
+                counters["not_modified"] += 1
+                self._send(304, headers=headers)
+                return
+        counters["ok"] += 1
+        self._send(200, body, headers)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve HTML fixtures with ETag/Last-Modified support.")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--dir", default="fixtures", help="Folder with the .html pages")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--no-validators", action="store_true", help="Never send ETag/Last-Modified or 304")
+    args = parser.parse_args()
+    settings.update(dir=args.dir, latency=args.latency, validators=not args.no_validators)
+    print(f"✅ Serving {args.dir} on http://127.0.0.1:{args.port}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), FixtureHandler).serve_forever()
@@ -1,20 +1,25 @@
 import gensim
 from gensim.models import Word2Vec
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 import os
-import time
-import requests
-from bs4 import BeautifulSoup
+import re
+import asyncio
 import threading
-import pickle  # For persistent storage
+from vector_store import VectorStore
+from crawler import Crawler
+from model_manager import ModelManager
+from passage_index import PassageIndex
 
-# Step 1: Initialize a vector database (dictionary for in-memory storage)
-vector_database = {}
+# Step 1: Initialize a vector database (sentence embeddings + ANN index, see vector_store.py)
+store = None  # VectorStore, opened once the model's vector size is known
+models = None  # ModelManager: trains in the background, serves read-only snapshots (see model_manager.py)
 corpus_data = []  # Stores all fetched and processed text data
+passages = None  # PassageIndex: BM25 over every crawled paragraph, for answers (see passage_index.py)
 MODEL_PATH = "word2vec_model.pkl"
-DB_PATH = "vector_database.pkl"
+STORE_PATH = "sentence_store"
+PASSAGES_PATH = "passages.jsonl"
+SOURCES_FILE = os.getenv("SOURCES_FILE", "sources.json")  # Source registry (URLs + crawl settings)
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", "crawl_state.json")  # ETags and paragraph fingerprints
 
 # Step 2: Train a Word2Vec model on the initial corpus
 def train_word2vec(corpus):
@@ -23,72 +28,112 @@ def train_word2vec(corpus):
     return model
 
 # Step 3: Update the vector database with new information
-def update_vector_database(model, new_data):
-    global vector_database
-    for sentence in new_data:
-        words = sentence.split()
-        for word in words:
-            if word in model.wv:
-                vector_database[word] = model.wv[word]
-    save_data()
+def split_sentences(paragraphs):
+    sentences = []
+    for paragraph in paragraphs:
+        sentences.extend(s.strip() for s in re.split(r"(?<=[.!?])\s+", paragraph) if len(s.split()) > 3)
+    return sentences
 
-# Step 4: Fetch new information from the web
-def fetch_new_information(url):
-    try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        new_data = [p.get_text() for p in soup.find_all('p') if len(p.get_text().split()) > 5]  # Filter short texts
-        return new_data
-    except Exception as e:
-        print(f"Error fetching data: {e}")
+def embed_texts(wv, texts):
+    """Mean of the known word vectors per text, L2-normalised (zero vector if no word is known)."""
+    vectors = np.zeros((len(texts), wv.vector_size), dtype=np.float32)
+    for i, text in enumerate(texts):
+        words = [word for word in text.split() if word in wv]
+        if words:
+            vectors[i] = wv[words].mean(axis=0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def update_vector_database(wv, new_data, source="seed"):
+    global store
+    if store is None:
+        store = VectorStore.open(STORE_PATH, wv.vector_size)
+    sentences = split_sentences(new_data) or new_data
+    # A re-crawled page replaces what we had from it instead of piling up duplicates
+    store.delete_source(source)
+    # Both calls append a small segment to the store's log; no full rewrite
+    store.add(sentences, embed_texts(wv, sentences), source)
+    if store.maybe_checkpoint():
+        print(f"✅ Vector store checkpointed ({len(store)} sentences)")
+
+# Step 4: Fetch new information from the web (see crawler.py)
+def apply_crawl_results(models, results):
+    """Trains on and indexes the never-seen paragraphs, then refreshes the vector store for every page that changed."""
+    global corpus_data
+    new_data = [paragraph for result in results for paragraph in result["new"]]
+    if new_data:
+        corpus_data.extend(new_data)
+        for result in results:
+            passages.add(result["new"], source=result["url"])  # Appends to the index; no refit; repeats are skipped
+        models.update([sentence.split() for sentence in new_data], epochs=5)  # Swaps in a new snapshot
+    wv = models.snapshot
+    for result in results:
+        if result["status"] == "changed":
+            update_vector_database(wv, result["paragraphs"], source=result["url"])
+            print(f"Vector database updated from {result['url']} ({len(result['new'])} new paragraphs)")
+    return len(new_data)
+
+# Step 5: Generate responses: BM25 passage answers (see passage_index.py), related sentences and word similarity
+def retrieve(user_input, wv, k=3):
+    """Top-k stored sentences closest to the input: [(score, sentence, source), ...]."""
+    if store is None or not len(store):
+        return []
+    query = embed_texts(wv, [user_input])[0]
+    if not query.any():
         return []
+    hits, seen = [], set()
+    for _, score, text, source in store.search(query, 2 * k):  # The same sentence can appear on several pages
+        if text not in seen and len(hits) < k:
+            seen.add(text)
+            hits.append((score, text, source))
+    return hits
 
-# Step 5: Generate responses using word similarity and TF-IDF weighting
-def generate_response(user_input, model):
-    global vector_database
-    if not vector_database:
-        return "I'm still learning. Please ask later."
+def generate_responses(user_inputs, neighbours):
+    """Batch version: every word of every input is looked up in one call to the neighbour table."""
+    if store is None or not len(store):
+        return ["I'm still learning. Please ask later."] * len(user_inputs)
     
-    user_words = user_input.split()
-    response_words = []
-    
-    for word in user_words:
-        if word in vector_database:
-            similar_words = model.wv.most_similar(word, topn=3)
-            response_words.append(similar_words[0][0])  # Pick the closest match
-        else:
-            response_words.append(word)  # Keep unknown words unchanged
+    split_inputs = [user_input.split() for user_input in user_inputs]
+    closest = iter(neighbours.nearest([word for words in split_inputs for word in words]))
     
-    return ' '.join(response_words)
+    # Pick the closest match; keep unknown words unchanged
+    return [' '.join(next(closest) or word for word in words) for words in split_inputs]
+
+def generate_response(user_input, neighbours):
+    return generate_responses([user_input], neighbours)[0]
 
 # Step 6: Periodically update the knowledge base
-def periodic_update(urls, model, interval=3600):  # Updates every hour
-    global corpus_data
-    while True:
-        for url in urls:
-            new_data = fetch_new_information(url)
-            if new_data:
-                corpus_data.extend(new_data)
-                model.build_vocab([sentence.split() for sentence in new_data], update=True)
-                model.train([sentence.split() for sentence in new_data], total_examples=len(new_data), epochs=5)
-                update_vector_database(model, new_data)
-                print(f"Vector database updated from {url}")
-        time.sleep(interval)
+async def crawl_forever(models, registry_path):
+    crawler, settings = Crawler.from_registry(registry_path, CRAWL_STATE_PATH)
+    async with crawler:  # One pooled HTTP client for every round
+        while True:
+            try:
+                results = await crawler.crawl()
+                if apply_crawl_results(models, results):
+                    models.save(MODEL_PATH)  # Once per round, and only if it learned something
+                # Only now are the new paragraphs stored, so they may be marked as seen
+                await asyncio.to_thread(crawler.save_state)
+            except Exception as e:
+                print(f"❌ Update round failed, retrying next round: {e}")
+                crawler.load_state()  # Pages and paragraphs from this round will be fetched again
+            await asyncio.sleep(settings["interval_seconds"])
+
+def periodic_update(models, registry_path=SOURCES_FILE):
+    asyncio.run(crawl_forever(models, registry_path))
 
 # Step 7: Persistent Storage
+# Sentences are logged by the store as they arrive (see vector_store.py); only the model (and its
+# neighbour table) is rewritten, to temporary files renamed over the old ones so a crash mid-write
+# never leaves a broken pickle
 def save_data():
-    with open(DB_PATH, "wb") as db_file:
-        pickle.dump(vector_database, db_file)
-    with open(MODEL_PATH, "wb") as model_file:
-        pickle.dump(model, model_file)
+    models.save(MODEL_PATH)
 
 def load_data():
-    global vector_database, model
-    if os.path.exists(DB_PATH) and os.path.exists(MODEL_PATH):
-        with open(DB_PATH, "rb") as db_file:
-            vector_database = pickle.load(db_file)
-        with open(MODEL_PATH, "rb") as model_file:
-            model = pickle.load(model_file)
+    global store, models
+    if os.path.exists(MODEL_PATH):
+        models = ModelManager.load(MODEL_PATH)  # Reuses the saved neighbour table when it still matches
+        store = VectorStore.open(STORE_PATH, models.vector_size)
+        print(f"📊 Vector store: {store.stats()}")
 
 # Modified main execution block
 if __name__ == "__main__":
@@ -97,32 +142,36 @@ if __name__ == "__main__":
     
     # Check if model exists, otherwise initialize with default corpus
     try:
-        if 'model' not in globals():
-            initial_corpus = [
-                "artificial intelligence is transforming technology rapidly",
-                "machine learning enables computers to learn from data",
-                "natural language processing helps machines understand human language"
-            ]
+        initial_corpus = [
+            "artificial intelligence is transforming technology rapidly",
+            "machine learning enables computers to learn from data",
+            "natural language processing helps machines understand human language"
+        ]
+        passages = PassageIndex.open(PASSAGES_PATH)
+        if not len(passages):
+            passages.add(initial_corpus, source="seed")
+        if models is None:
             corpus_data.extend(initial_corpus)
-            model = train_word2vec(initial_corpus)
-            update_vector_database(model, initial_corpus)
+            models = ModelManager(train_word2vec(initial_corpus))
+            update_vector_database(models.snapshot, initial_corpus)
             print("Initialized with default corpus")
         else:
             print("Loaded existing model")
+            if not len(store):  # Model saved before the vector store existed
+                update_vector_database(models.snapshot, initial_corpus)
             
-        # Start update thread with real news sources
-        news_sources = [
-            "https://www.bbc.com/news/technology",
-            "https://techcrunch.com/"
-        ]
-        update_thread = threading.Thread(
-            target=periodic_update,
-            args=(news_sources, model, 1800)  # Update every 30 minutes instead of hour
-        )
-        update_thread.daemon = True
-        update_thread.start()
+        # Start update thread with the registered news sources
+        if os.path.exists(SOURCES_FILE):
+            update_thread = threading.Thread(
+                target=periodic_update,
+                args=(models, SOURCES_FILE)  # Sources and interval come from the registry
+            )
+            update_thread.daemon = True
+            update_thread.start()
+        else:
+            print(f"⚠️ No source registry at {SOURCES_FILE}; running without web updates")
         
-        print("Chatbot ready! Type 'exit' or 'quit' to stop.")
+        print("Chatbot ready! Type 'stats' for model/store metrics, 'exit' or 'quit' to stop.")
         while True:
             try:
                 user_input = input("You: ").strip()
@@ -130,9 +179,21 @@ if __name__ == "__main__":
                     print("Saving data and shutting down...")
                     save_data()
                     break
+                if user_input.lower() == "stats":
+                    print(f"📊 Model: {models.stats()}")
+                    print(f"📊 Vector store: {store.stats()}")
+                    print(f"📊 Passages: {passages.stats()}")
+                    continue
                 if user_input:  # Only process non-empty input
-                    response = generate_response(user_input, model)
-                    print(f"Chatbot: {response}")
+                    wv = models.snapshot  # One snapshot per query, even if a new one is swapped in meanwhile
+                    answer = passages.answer(user_input)
+                    if answer:
+                        print(f"Chatbot: {answer['answer']}")
+                        print(f"  📰 Source: {', '.join(answer['sources'])}")
+                    else:  # No passage mentions the question's terms
+                        print(f"Chatbot: {generate_response(user_input, models.neighbours)}")
+                    for score, sentence, source in retrieve(user_input, wv):
+                        print(f"  📊 {score:.2f} [{source}] {sentence}")
             except KeyboardInterrupt:
                 print("\nInterrupted by user. Saving data...")
                 save_data()
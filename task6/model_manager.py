@@ -0,0 +1,99 @@
+import os
+import time
+import pickle
+import threading
+from gensim.models import KeyedVectors
+from neighbours import NeighbourTable
+
+# ✅ **Double-buffered Word2Vec Model**
+# Queries never touch the model being trained. The updater thread trains its own
+# Word2Vec object, then freezes a copy of the word vectors (KeyedVectors with
+# precomputed norms, arrays marked read-only) and swaps it in with a single
+# attribute assignment. Readers grab `manager.snapshot` once per query and keep
+# using that version even if a newer one is published meanwhile, so queries
+# neither wait for training nor see half-updated vectors. Each snapshot comes
+# with a precomputed nearest-neighbour table (see neighbours.py), refreshed
+# only for the words the update touched.
+
+
+def freeze(wv):
+    """Read-only copy of a model's KeyedVectors, with the norms most_similar needs already filled in."""
+    snapshot = KeyedVectors(wv.vector_size)
+    snapshot.add_vectors(list(wv.index_to_key), wv.vectors)
+    snapshot.fill_norms()
+    snapshot.vectors.flags.writeable = False
+    snapshot.norms.flags.writeable = False
+    return snapshot
+
+
+class ModelManager:
+    def __init__(self, model, neighbours_k=10, neighbours_path=None):
+        self._model = model  # Only used under _lock, by the updater
+        self._lock = threading.Lock()
+        self.version = 1
+        self.snapshot = freeze(model.wv)
+        start = time.perf_counter()
+        self.neighbours = neighbours_path and NeighbourTable.load(neighbours_path, self.snapshot)
+        if self.neighbours is None:
+            self.neighbours = NeighbourTable.build(self.snapshot, neighbours_k)
+        self.metrics = {"updates": 0, "trained_sentences": 0, "last_update_seconds": 0.0,
+                        "max_update_seconds": 0.0, "total_update_seconds": 0.0, "last_freeze_seconds": 0.0,
+                        "last_neighbours_seconds": round(time.perf_counter() - start, 4),
+                        "neighbour_rows_refreshed": self.neighbours.rows_computed, "swapped_at": time.time()}
+
+    @staticmethod
+    def neighbours_path(path):
+        return os.path.splitext(path)[0] + "_neighbours.npz"
+
+    @classmethod
+    def load(cls, path, neighbours_k=10):
+        """Unpickles a saved model, reusing its saved neighbour table if it still matches the vocabulary."""
+        with open(path, "rb") as model_file:
+            model = pickle.load(model_file)
+        return cls(model, neighbours_k, cls.neighbours_path(path))
+
+    @property
+    def vector_size(self):
+        return self.snapshot.vector_size
+
+    def update(self, sentences, epochs=5):
+        """Trains on new tokenised sentences and publishes a new snapshot; returns its version."""
+        if not sentences:
+            return self.version
+        with self._lock:
+            start = time.perf_counter()
+            self._model.build_vocab(sentences, update=True)
+            self._model.train(sentences, total_examples=len(sentences), epochs=epochs)
+            frozen_at = time.perf_counter()
+            snapshot = freeze(self._model.wv)
+            refreshed_at = time.perf_counter()
+            neighbours = self.neighbours.refresh(snapshot, {word for sentence in sentences for word in sentence})
+            # Swap: readers holding the old snapshot/table finish with them undisturbed
+            self.snapshot = snapshot
+            self.neighbours = neighbours
+            self.version += 1
+            elapsed = time.perf_counter() - start
+            self.metrics.update(
+                updates=self.metrics["updates"] + 1,
+                trained_sentences=self.metrics["trained_sentences"] + len(sentences),
+                last_update_seconds=round(elapsed, 4),
+                max_update_seconds=round(max(self.metrics["max_update_seconds"], elapsed), 4),
+                total_update_seconds=round(self.metrics["total_update_seconds"] + elapsed, 4),
+                last_freeze_seconds=round(refreshed_at - frozen_at, 4),
+                last_neighbours_seconds=round(time.perf_counter() - refreshed_at, 4),
+                neighbour_rows_refreshed=neighbours.rows_computed,
+                swapped_at=time.time(),
+            )
+            return self.version
+
+    def save(self, path):
+        """Pickles the trainable model (and saves its neighbour table) via temporary files renamed into place."""
+        with self._lock:
+            with open(path + ".tmp", "wb") as model_file:
+                pickle.dump(self._model, model_file)
+            os.replace(path + ".tmp", path)
+            self.neighbours.save(self.neighbours_path(path), self.snapshot)
+
+    def stats(self):
+        return {"snapshot_version": self.version, "vocab_size": len(self.snapshot.index_to_key),
+                "neighbour_table_bytes": self.neighbours.nbytes(), **self.metrics}
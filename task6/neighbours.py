@@ -0,0 +1,162 @@
+import os
+import hashlib
+import numpy as np
+
+# ✅ **Precomputed Nearest-neighbour Table**
+# For every word in a snapshot, its top-k most similar words are stored as an
+# int32 index matrix with float16 cosine scores (n x k), so word substitution
+# is an array lookup instead of a scan of the whole vocabulary. After a
+# training update only the words that were trained on (plus new ones) have
+# moved: their rows are recomputed, and every other row is merged with fresh
+# scores against just those words. Rows where that merge can't prove the
+# result is still exact are recomputed too. A table is never modified after
+# it is built; refresh() returns a new one.
+
+
+def snapshot_digest(wv):
+    """Fingerprint of a snapshot's vocabulary and vectors, to tell whether a saved table still applies."""
+    digest = hashlib.blake2b("\n".join(wv.index_to_key).encode("utf-8"), digest_size=16)
+    digest.update(np.ascontiguousarray(wv.vectors).data)
+    return digest.hexdigest()
+
+
+def _top_k(scores, k):
+    """Row-wise top-k of a score matrix, best first: (column indices, scores)."""
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    vals = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-vals, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+def _chunk_rows(columns, budget=4_000_000):
+    """Rows per block so a block of scores stays around 16 MB."""
+    return max(16, budget // max(1, columns))
+
+
+class NeighbourTable:
+    def __init__(self, wv, indices, scores, k):
+        self.k = k
+        self.index_to_key = wv.index_to_key
+        self.key_to_index = wv.key_to_index
+        self.indices = indices  # int32 (n, k), best first
+        self.scores = scores  # float16 (n, k)
+        self.indices.flags.writeable = False
+        self.scores.flags.writeable = False
+        self.rows_computed = len(indices)  # Rows recomputed from scratch when this table was made
+
+    def __len__(self):
+        return len(self.indices)
+
+    @staticmethod
+    def _unit(wv):
+        return np.ascontiguousarray(wv.get_normed_vectors(), dtype=np.float32)
+
+    @staticmethod
+    def _compute_rows(unit, rows, k):
+        indices = np.empty((len(rows), k), dtype=np.int32)
+        scores = np.empty((len(rows), k), dtype=np.float16)
+        step = _chunk_rows(len(unit))
+        for start in range(0, len(rows), step):
+            block = rows[start:start + step]
+            sims = unit[block] @ unit.T
+            sims[np.arange(len(block)), block] = -np.inf  # A word is not its own neighbour
+            top_i, top_s = _top_k(sims, k)
+            indices[start:start + len(block)] = top_i
+            scores[start:start + len(block)] = top_s
+        return indices, scores
+
+    @classmethod
+    def build(cls, wv, k=10):
+        """Full table for a KeyedVectors snapshot (one pass of blocked matrix products)."""
+        n = len(wv.index_to_key)
+        k_eff = max(0, min(k, n - 1))
+        if k_eff == 0:
+            return cls(wv, np.empty((n, 0), dtype=np.int32), np.empty((n, 0), dtype=np.float16), k)
+        indices, scores = cls._compute_rows(cls._unit(wv), np.arange(n), k_eff)
+        return cls(wv, indices, scores, k)
+
+    def refresh(self, wv, changed_words):
+        """Table for a newer snapshot of the same model where only `changed_words` (and new words) moved."""
+        n_old, n = len(self), len(wv.index_to_key)
+        k_eff = self.indices.shape[1]
+        # Vocabulary updates only append; anything else (or a still-growing k) needs a full build
+        if k_eff != min(self.k, n - 1) or wv.index_to_key[:n_old] != self.index_to_key[:n_old]:
+            return NeighbourTable.build(wv, self.k)
+        changed = {wv.key_to_index[w] for w in changed_words if w in wv.key_to_index}
+        changed = np.array(sorted(changed | set(range(n_old, n))), dtype=np.int64)
+        if len(changed) > n // 2:
+            return NeighbourTable.build(wv, self.k)
+        if not len(changed):
+            table = NeighbourTable(wv, self.indices, self.scores, self.k)
+            table.rows_computed = 0
+            return table
+        indices = np.empty((n, k_eff), dtype=np.int32)
+        scores = np.empty((n, k_eff), dtype=np.float16)
+        indices[:n_old], scores[:n_old] = self.indices, self.scores
+
+        unit = self._unit(wv)
+        is_changed = np.zeros(n, dtype=bool)
+        is_changed[changed] = True
+        indices[changed], scores[changed] = self._compute_rows(unit, changed, k_eff)
+
+        # Unchanged rows: keep stored neighbours that didn't move, rescore the ones that did
+        others = np.flatnonzero(~is_changed)
+        changed_unit = unit[changed]
+        dirty = []
+        step = _chunk_rows(len(changed) + k_eff)
+        for start in range(0, len(others), step):
+            block = others[start:start + step]
+            stored_i = indices[block]
+            stored_s = scores[block].astype(np.float32)
+            kth = stored_s[:, -1].copy()
+            stored_s[is_changed[stored_i]] = -np.inf
+            cand_i = np.concatenate([stored_i, np.broadcast_to(changed, (len(block), len(changed)))], axis=1)
+            cand_s = np.concatenate([stored_s, unit[block] @ changed_unit.T], axis=1)
+            top, top_s = _top_k(cand_s, k_eff)
+            indices[block] = np.take_along_axis(cand_i, top, axis=1)
+            scores[block] = top_s
+            # Words we never stored scored at most the old k-th; below that, one of them may belong here
+            dirty.append(block[top_s[:, -1] < kth])
+        dirty = np.concatenate(dirty) if dirty else np.empty(0, dtype=np.int64)
+        if len(dirty):
+            indices[dirty], scores[dirty] = self._compute_rows(unit, dirty, k_eff)
+        table = NeighbourTable(wv, indices, scores, self.k)
+        table.rows_computed = len(changed) + len(dirty)
+        return table
+
+    def most_similar(self, word, topn=3):
+        """Like KeyedVectors.most_similar for a single word, from the table: [(word, score), ...]."""
+        row = self.key_to_index.get(word)
+        if row is None:
+            return []
+        return [(self.index_to_key[i], float(s)) for i, s in zip(self.indices[row, :topn], self.scores[row, :topn])]
+
+    def nearest(self, words):
+        """Closest neighbour of each word (None if unknown), for any number of words in one call."""
+        rows = np.array([self.key_to_index.get(word, -1) for word in words], dtype=np.int64)
+        known = (rows >= 0) & (self.indices.shape[1] > 0)
+        result = [None] * len(words)
+        for position, neighbour in zip(np.flatnonzero(known), self.indices[rows[known], 0]):
+            result[position] = self.index_to_key[neighbour]
+        return result
+
+    def save(self, path, wv):
+        """Writes the arrays (plus the digest of the snapshot `wv` they were built from) via a temporary file + rename."""
+        with open(path + ".tmp", "wb") as table_file:
+            np.savez(table_file, indices=self.indices, scores=self.scores, k=self.k, digest=snapshot_digest(wv))
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path, wv):
+        """The saved table if it was built from exactly this snapshot, else None."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as saved:
+            if str(saved["digest"]) != snapshot_digest(wv):
+                return None
+            table = cls(wv, saved["indices"], saved["scores"], int(saved["k"]))
+        table.rows_computed = 0
+        return table
+
+    def nbytes(self):
+        return self.indices.nbytes + self.scores.nbytes
@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from array import array
+import numpy as np
+
+# ✅ **Incremental BM25 Passage Index**
+# Crawled paragraphs are indexed as they arrive: each new passage appends its
+# (doc id, term frequency) pairs to the postings of its terms, and document
+# frequencies and the average length are just running totals. Nothing is
+# precomputed per document, so an update costs only the tokens it adds. BM25
+# weights are worked out at query time from the postings of the query's terms.
+# Passages are persisted as an append-only JSON-lines log and re-indexed from
+# it at startup; a torn last line (crash mid-append) is cut off before anything
+# new is appended, so it can't swallow later records. Adding a passage that is
+# already indexed is a no-op, so a crawl round retried after a failure doesn't
+# log its paragraphs twice. answer() picks the query's best sentences out of the top
+# passages as a short extractive answer.
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-'][a-z0-9]+)*")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was were what "
+    "when where which who why will with you your".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def fingerprint(text):
+    """Same normalisation as the crawler's paragraph fingerprints."""
+    normalized = re.sub(r"[^\w]+", " ", text.lower()).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+class PassageIndex:
+    def __init__(self, path=None, k1=1.2, b=0.75):
+        self.path = path
+        self.k1, self.b = k1, b
+        self.passages = []  # [{"text": ..., "source": ...}]
+        self.postings = {}  # term -> (array of doc ids, array of term frequencies)
+        self.doc_lens = array("I")
+        self.total_len = 0
+        self.fingerprints = set()  # Of every indexed passage, so re-adding one is a no-op
+        self._lock = threading.Lock()  # The crawler thread adds while the REPL searches
+
+    def __len__(self):
+        return len(self.passages)
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """Index of every passage logged in `path` so far (new ones are appended to it)."""
+        index = cls(path, **kwargs)
+        if os.path.exists(path):
+            complete = 0  # Byte offset just past the last line that ends with a newline
+            with open(path, "rb") as log_file:
+                for line in log_file:
+                    if not line.endswith(b"\n"):
+                        break  # Torn last line from a crash mid-append
+                    complete += len(line)
+                    try:
+                        passage = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+                    index._index(passage["text"], passage["source"])
+            if complete < os.path.getsize(path):
+                with open(path, "r+b") as log_file:
+                    log_file.truncate(complete)
+        return index
+
+    def _index(self, text, source):
+        doc_id = len(self.passages)
+        tokens = tokenize(text)
+        frequencies = {}
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + 1
+        for token, count in frequencies.items():
+            if token not in self.postings:
+                self.postings[token] = (array("I"), array("I"))
+            docs, tfs = self.postings[token]
+            docs.append(doc_id)
+            tfs.append(count)
+        self.passages.append({"text": text, "source": source})
+        self.fingerprints.add(fingerprint(text))
+        self.doc_lens.append(len(tokens))
+        self.total_len += len(tokens)
+
+    def add(self, texts, source):
+        """Indexes one crawl batch of paragraphs from a source and appends them to the log.
+
+        Passages already in the index are skipped; returns how many were added.
+        """
+        with self._lock:
+            texts = [text for text in dict.fromkeys(texts)
+                     if text.strip() and fingerprint(text) not in self.fingerprints]
+            if not texts:
+                return 0
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as log_file:
+                    log_file.write("".join(json.dumps({"text": t, "source": source}) + "\n" for t in texts))
+                    log_file.flush()
+                    os.fsync(log_file.fileno())
+            for text in texts:
+                self._index(text, source)
+        return len(texts)
+
+    def _idf(self, df, n_docs):
+        return np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=3):
+        """Top-k passages by BM25: [(doc id, score, text, source), ...], best first."""
+        with self._lock:
+            n_docs = len(self.passages)
+            terms = [term for term in dict.fromkeys(tokenize(query)) if term in self.postings]
+            if not n_docs or not terms:
+                return []
+            avgdl = self.total_len / n_docs
+            doc_lens = np.frombuffer(self.doc_lens, dtype=np.uint32)[:n_docs]
+            scores = np.zeros(n_docs, dtype=np.float64)
+            for term in terms:
+                docs, tfs = self.postings[term]
+                docs = np.frombuffer(docs, dtype=np.uint32)
+                tfs = np.frombuffer(tfs, dtype=np.uint32).astype(np.float64)
+                norm = self.k1 * (1.0 - self.b + self.b * doc_lens[docs] / avgdl)
+                scores[docs] += self._idf(len(docs), n_docs) * tfs * (self.k1 + 1.0) / (tfs + norm)
+            matched = np.flatnonzero(scores)
+            top = matched[np.argsort(-scores[matched], kind="stable")[:k]]
+            return [(int(i), float(scores[i]), self.passages[i]["text"], self.passages[i]["source"]) for i in top]
+
+    def answer(self, query, k=3, max_sentences=2):
+        """Extractive answer: the sentences of the top-k passages that cover the query terms best.
+
+        Returns {"answer": str, "passages": [...search() hits...]}, or None when nothing matches.
+        """
+        hits = self.search(query, k)
+        if not hits:
+            return None
+        n_docs = len(self.passages)
+        weights = {}
+        for term in dict.fromkeys(tokenize(query)):
+            if term in self.postings:
+                weights[term] = float(self._idf(len(self.postings[term][0]), n_docs))
+        candidates = []
+        for rank, (_, _, text, source) in enumerate(hits):
+            for position, sentence in enumerate(SENTENCE_RE.split(text)):
+                covered = set(tokenize(sentence)) & weights.keys()
+                if covered:
+                    # Rarer query terms count more; ties go to better passages, then earlier sentences
+                    candidates.append((-sum(weights[t] for t in covered), rank, position, sentence.strip(), source))
+        best = sorted(candidates)[:max_sentences]
+        best.sort(key=lambda c: (c[1], c[2]))  # Read in passage order
+        return {"answer": " ".join(c[3] for c in best), "sources": list(dict.fromkeys(c[4] for c in best)),
+                "passages": hits}
+
+    def stats(self):
+        return {"passages": len(self.passages), "terms": len(self.postings),
+                "avg_length": round(self.total_len / len(self.passages), 1) if self.passages else 0.0}
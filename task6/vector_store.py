@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import threading
+from collections import defaultdict
+import numpy as np
+
+# ✅ **Sentence-level Vector Store**
+# Sentence embeddings live in a float32 matrix (rows L2-normalised) next to
+# parallel lists of texts and sources. Search uses a FAISS HNSW graph when faiss
+# is installed and an exact matrix-vector product otherwise (fast enough for
+# tens of thousands of sentences). Deleting a source only tombstones its rows;
+# compact() drops them and rebuilds the index once enough have piled up.
+#
+# ✅ **Append-only Persistence**
+# A store opened with VectorStore.open(path) writes every change as a small
+# numbered segment (seg-N.npy + seg-N.json) instead of rewriting everything, so
+# an update costs about as much as the data it adds. Once the segments outgrow
+# the base snapshot, checkpoint() writes a new base (base-N.npy/.json, plus the
+# FAISS index) and drops the old files. Every file is written to a temporary
+# name and renamed into place; a segment only counts once its .json exists, and
+# CURRENT names the base, so a crash mid-write leaves the last good state. At
+# startup the base matrix is memory-mapped and only newer segments are replayed.
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+SEGMENT_PATTERN = re.compile(r"^seg-(\d+)\.json$")
+
+
+def _write_atomic(path, write):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as tmp_file:
+        write(tmp_file)
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _write_json(path, data):
+    _write_atomic(path, lambda f: f.write(json.dumps(data).encode("utf-8")))
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+class VectorStore:
+    def __init__(self, dim, use_faiss=None, hnsw_m=32, ef_search=64, compact_ratio=0.25,
+                 min_checkpoint_bytes=1 << 20):
+        self.dim = dim
+        self.use_faiss = (faiss is not None) if use_faiss is None else use_faiss
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.compact_ratio = compact_ratio
+        self.min_checkpoint_bytes = min_checkpoint_bytes
+        self._base = np.empty((0, dim), dtype=np.float32)  # Read-only; memory-mapped after open()
+        self._tail = np.empty((0, dim), dtype=np.float32)  # Rows added since; capacity grows by doubling
+        self.count = 0
+        self.texts = []
+        self.sources = []
+        self.alive = np.empty(0, dtype=bool)
+        self._rows_by_source = defaultdict(list)
+        self.index = None
+        self._lock = threading.RLock()  # The crawler thread writes while the REPL searches
+        # Persistence (set by open())
+        self.path = None
+        self.segment = 0  # Number of the last segment applied
+        self.base_bytes = 0
+        self.log_bytes = 0
+        self.checkpoints = 0
+        self._reset_index()
+
+    @property
+    def vectors(self):
+        tail = self._tail[:self.count - len(self._base)]
+        if not len(self._base):
+            return tail
+        if not len(tail):
+            return self._base
+        return np.concatenate([self._base, tail])
+
+    def __len__(self):
+        return int(self.alive[:self.count].sum())
+
+    def _reset_index(self):
+        self.index = None
+        if self.use_faiss:
+            self.index = faiss.IndexHNSWFlat(self.dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            self.index.hnsw.efSearch = self.ef_search
+            if self.count:
+                self.index.add(self.vectors)
+
+    def _reserve(self, extra):
+        needed = self.count + extra
+        if needed > len(self.alive):
+            alive = np.zeros(max(needed, 2 * len(self.alive), 1024), dtype=bool)
+            alive[:self.count] = self.alive[:self.count]
+            self.alive = alive
+        tail_rows = self.count - len(self._base)
+        if tail_rows + extra > len(self._tail):
+            tail = np.empty((max(tail_rows + extra, 2 * len(self._tail), 1024), self.dim), dtype=np.float32)
+            tail[:tail_rows] = self._tail[:tail_rows]
+            self._tail = tail
+
+    # In-memory changes (no logging)
+    def _append(self, texts, vectors, source):
+        self._reserve(len(vectors))
+        start = self.count
+        tail_start = start - len(self._base)
+        self._tail[tail_start:tail_start + len(vectors)] = vectors
+        self.alive[start:start + len(vectors)] = True
+        self.count += len(vectors)
+        self.texts.extend(texts)
+        self.sources.extend([source] * len(vectors))
+        self._rows_by_source[source].extend(range(start, self.count))
+        if self.index is not None:
+            self.index.add(vectors)
+        return list(range(start, self.count))
+
+    def _delete(self, source, auto_compact=True):
+        rows = self._rows_by_source.pop(source, [])
+        self.alive[rows] = False
+        dead = self.count - len(self)
+        if auto_compact and self.count and dead / self.count > self.compact_ratio:
+            self.compact()
+        return len(rows)
+
+    def add(self, texts, vectors, source):
+        """Appends sentences (with their normalised vectors) under one source; returns their row ids."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(vectors):
+            return []
+        with self._lock:
+            self._log({"op": "add", "source": source, "texts": list(texts)}, vectors)
+            return self._append(texts, vectors, source)
+
+    def delete_source(self, source):
+        """Tombstones every sentence from a source (e.g. before re-adding a re-crawled page)."""
+        with self._lock:
+            if not self._rows_by_source.get(source):
+                return 0
+            self._log({"op": "delete", "source": source})
+            return self._delete(source)
+
+    def compact(self):
+        """Drops tombstoned rows so the matrix stays contiguous, then rebuilds the ANN index."""
+        with self._lock:
+            keep = np.flatnonzero(self.alive[:self.count])
+            self._tail = np.ascontiguousarray(self.vectors[keep])
+            self._base = np.empty((0, self.dim), dtype=np.float32)
+            self.texts = [self.texts[i] for i in keep]
+            self.sources = [self.sources[i] for i in keep]
+            self.count = len(keep)
+            self.alive = np.ones(self.count, dtype=bool)
+            self._rows_by_source = defaultdict(list)
+            for row, source in enumerate(self.sources):
+                self._rows_by_source[source].append(row)
+            self._reset_index()
+
+    def search(self, query_vector, k=5):
+        """Top-k live sentences by cosine similarity: [(row id, score, text, source), ...]."""
+        with self._lock:
+            if not len(self):
+                return []
+            query = np.asarray(query_vector, dtype=np.float32).reshape(1, self.dim)
+            k = min(k, len(self))
+            dead = self.count - len(self)
+            if self.index is not None:
+                # Over-fetch so tombstoned rows can be skipped
+                scores, rows = self.index.search(query, min(self.count, k + dead))
+                hits = [(int(r), float(s)) for r, s in zip(rows[0], scores[0]) if r >= 0 and self.alive[r]][:k]
+                if len(hits) == k:
+                    return [(r, s, self.texts[r], self.sources[r]) for r, s in hits]
+            tail = self._tail[:self.count - len(self._base)]
+            scores = np.concatenate([self._base @ query[0], tail @ query[0]])
+            scores[~self.alive[:self.count]] = -np.inf
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(int(r), float(scores[r]), self.texts[r], self.sources[r]) for r in top]
+
+    # Segment log
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _log(self, record, vectors=None):
+        if self.path is None:
+            return
+        self.segment += 1
+        name = f"seg-{self.segment:08d}"
+        if vectors is not None:
+            _write_atomic(self._file(name + ".npy"), lambda f: np.save(f, vectors))
+            self.log_bytes += vectors.nbytes
+        payload = json.dumps(record).encode("utf-8")
+        _write_atomic(self._file(name + ".json"), lambda f: f.write(payload))  # Commit point
+        self.log_bytes += len(payload)
+
+    def maybe_checkpoint(self):
+        """Checkpoints once the log outgrows the base, so rewrites stay proportional to what was added."""
+        if self.path is not None and self.log_bytes > max(self.base_bytes, self.min_checkpoint_bytes):
+            self.checkpoint()
+            return True
+        return False
+
+    def checkpoint(self):
+        """Folds the segments into a new base snapshot and removes the files it replaces."""
+        with self._lock:
+            self.compact()
+            name = f"base-{self.segment:08d}"
+            vectors = self.vectors
+            _write_atomic(self._file(name + ".npy"), lambda f: np.save(f, vectors))
+            _write_json(self._file(name + ".json"), {"dim": self.dim, "texts": self.texts, "sources": self.sources})
+            if self.index is not None:
+                index_path = self._file(name + ".faiss")
+                faiss.write_index(self.index, index_path + ".tmp")
+                os.replace(index_path + ".tmp", index_path)
+            _write_json(self._file("CURRENT"), {"base": name, "segment": self.segment})  # Commit point
+            for file_name in os.listdir(self.path):
+                match = SEGMENT_PATTERN.match(file_name.replace(".npy", ".json"))
+                stale_base = file_name.startswith("base-") and not file_name.startswith(name)
+                if stale_base or (match and int(match.group(1)) <= self.segment):
+                    os.remove(self._file(file_name))
+            # Serve the snapshot from the page cache instead of a private copy
+            self._base = np.load(self._file(name + ".npy"), mmap_mode="r")
+            self._tail = np.empty((0, self.dim), dtype=np.float32)
+            self.base_bytes = vectors.nbytes
+            self.log_bytes = 0
+            self.checkpoints += 1
+
+    @classmethod
+    def open(cls, path, dim, **kwargs):
+        """Loads (or creates) a store in `path`: base memory-mapped, newer segments replayed."""
+        os.makedirs(path, exist_ok=True)
+        store = cls(dim, **kwargs)
+        store.path = path
+        current_path = os.path.join(path, "CURRENT")
+        if os.path.exists(current_path):
+            current = _read_json(current_path)
+            base_path = os.path.join(path, current["base"])
+            meta = _read_json(base_path + ".json")
+            if meta["dim"] != dim:
+                raise ValueError(f"Store in {path} holds {meta['dim']}-d vectors, expected {dim}")
+            store._base = np.load(base_path + ".npy", mmap_mode="r")
+            store.count = len(store._base)
+            store.texts, store.sources = meta["texts"], meta["sources"]
+            store.alive = np.ones(store.count, dtype=bool)
+            for row, source in enumerate(store.sources):
+                store._rows_by_source[source].append(row)
+            store.segment = current["segment"]
+            store.base_bytes = store._base.nbytes
+            if store.use_faiss and os.path.exists(base_path + ".faiss"):
+                store.index = faiss.read_index(base_path + ".faiss")
+                store.index.hnsw.efSearch = store.ef_search
+            else:
+                store._reset_index()
+
+        # Replay the segments written after the base, in order; half-written ones have no .json yet
+        segments = sorted(int(m.group(1)) for m in map(SEGMENT_PATTERN.match, os.listdir(path)) if m)
+        for number in segments:
+            if number <= store.segment:
+                continue
+            name = os.path.join(path, f"seg-{number:08d}")
+            record = _read_json(name + ".json")
+            if record["op"] == "add":
+                vectors = np.load(name + ".npy")
+                store._append(record["texts"], vectors, record["source"])
+                store.log_bytes += vectors.nbytes
+            else:
+                store._delete(record["source"], auto_compact=False)  # Keep the base mapped
+            store.log_bytes += os.path.getsize(name + ".json")
+            store.segment = number
+        return store
+
+    def stats(self):
+        return {"sentences": len(self), "rows": self.count, "segment": self.segment,
+                "base_bytes": self.base_bytes, "log_bytes": self.log_bytes, "checkpoints": self.checkpoints,
+                "faiss": self.index is not None}
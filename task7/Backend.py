@@ -4,12 +4,15 @@ import numpy as np
 import nltk
 import os
 from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import TfidfVectorizer
+import argparse
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 from collections import Counter
-from concurrent.futures import ThreadPoolExecutor
+from ingest import ALL_CATEGORIES, IngestStats, stream_records
+from paper_index import DEFAULT_INDEX_DIR, load_index
+from model_bundle import export_bundle
 
 # Disable TensorFlow OneDNN optimization to avoid conflicts
 os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
@@ -22,43 +25,17 @@ nltk.download("wordnet")
 # ✅ **Dataset Path**
 file_path = "D:/project101/task7/arxiv-metadata-oai-snapshot.json"
 
-# ✅ **Load and Process Dataset with Multithreading**
-def load_dataset(file_path, max_records=10000):
+# ✅ **Load and Process Dataset (streaming, bounded memory)**
+def load_dataset(file_path, max_records=10000, max_per_class=None, workers=None):
     texts, labels = [], []
-    
-    def process_line(line):
-        try:
-            data = json.loads(line)
-            title = data.get("title", "").strip()
-            abstract = data.get("abstract", "").strip()
-            categories = data.get("categories", "").split()
-
-            # Map categories to broader groups
-            category_map = {
-                "cs.AI": "Artificial Intelligence",
-                "cs.LG": "Machine Learning",
-                "cs.CL": "Computational Linguistics",
-                "cs.NE": "Neural Networks",
-                "cs.CV": "Computer Vision",
-                "cs.DS": "Data Science",
-                "cs.IR": "Information Retrieval",
-            }
-
-            # Assign mapped category or default "Other CS"
-            matched_category = next((category_map[cat] for cat in categories if cat in category_map), "Other CS")
-
-            if matched_category:
-                return title + " " + abstract, matched_category
-        except json.JSONDecodeError:
-            return None
+    stats = IngestStats()
 
-    with open(file_path, "r", encoding="utf-8") as file:
-        with ThreadPoolExecutor() as executor:
-            for result in executor.map(process_line, file):
-                if result and len(texts) < max_records:
-                    texts.append(result[0])
-                    labels.append(result[1])
+    for text, label in stream_records(file_path, max_records=max_records, max_per_class=max_per_class,
+                                      workers=workers, stats=stats):
+        texts.append(text)
+        labels.append(label)
 
+    stats.report()
     return texts, labels
 
 # ✅ **Balance Dataset to Avoid Overfitting**
@@ -101,12 +78,84 @@ def train_text_classifier(texts, labels):
 
     return model, vectorizer, label_encoder
 
+# ✅ **Out-of-Core Training (streaming mini-batches)**
+def train_streaming_classifier(file_path, batch_size=5000, holdout_every=20, holdout_size=20000,
+                               checkpoint_every=20, checkpoint_path="streaming_checkpoint.pkl",
+                               max_records=None, cs_only=True):
+    """Trains on the whole snapshot without holding it in memory.
+
+    HashingVectorizer is stateless, so every mini-batch is vectorized on its own
+    and fed to SGDClassifier.partial_fit. Every ``holdout_every``-th record goes to
+    a capped held-out set that is scored at each checkpoint.
+    """
+    label_encoder = LabelEncoder().fit(ALL_CATEGORIES)
+    classes = np.arange(len(label_encoder.classes_))
+    vectorizer = HashingVectorizer(n_features=2 ** 20, stop_words="english", alternate_sign=False, norm="l2")
+    model = SGDClassifier(loss="log_loss", alpha=1e-6, random_state=42)
+
+    holdout_texts, holdout_labels = [], []
+    batch_texts, batch_labels = [], []
+    batches = 0
+    stats = IngestStats()
+
+    def evaluate():
+        if not holdout_texts or batches == 0:
+            return None
+        X_holdout = vectorizer.transform(holdout_texts)
+        return model.score(X_holdout, label_encoder.transform(holdout_labels))
+
+    def train_batch():
+        nonlocal batches
+        X_batch = vectorizer.transform(batch_texts)
+        model.partial_fit(X_batch, label_encoder.transform(batch_labels), classes=classes)
+        batch_texts.clear()
+        batch_labels.clear()
+        batches += 1
+
+        if batches % checkpoint_every == 0:
+            save_checkpoint(model, vectorizer, label_encoder, checkpoint_path)
+            accuracy = evaluate()
+            print(f"💾 Checkpoint after {batches} batches ({stats.records} records, "
+                  f"{stats.records_per_second:,.0f} records/s) | Held-out accuracy: {accuracy:.4f}")
+
+    records = stream_records(file_path, max_records=max_records, stats=stats, cs_only=cs_only)
+    for i, (text, label) in enumerate(records):
+        # Once the held-out set is full, every record goes to training
+        if i % holdout_every == 0 and len(holdout_texts) < holdout_size:
+            holdout_texts.append(text)
+            holdout_labels.append(label)
+            continue
+
+        batch_texts.append(text)
+        batch_labels.append(label)
+        if len(batch_texts) >= batch_size:
+            train_batch()
+
+    if batch_texts:
+        train_batch()
+
+    save_checkpoint(model, vectorizer, label_encoder, checkpoint_path)
+    stats.report()
+    accuracy = evaluate()
+    if accuracy is not None:
+        print(f"✅ Streaming Training Complete | Batches: {batches} | Held-out accuracy: {accuracy:.4f}")
+    return model, vectorizer, label_encoder
+
+# ✅ **Save Training Checkpoint (atomic)**
+def save_checkpoint(model, vectorizer, label_encoder, checkpoint_path):
+    # Write to a temp file first so a crash never leaves a truncated checkpoint
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "wb") as checkpoint_file:
+        pickle.dump((model, vectorizer, label_encoder), checkpoint_file)
+    os.replace(tmp_path, checkpoint_path)
+
 # ✅ **Save Model and Assets**
 def save_model(model, vectorizer, label_encoder):
     try:
         pickle.dump(model, open("chatbot_model.pkl", "wb"))
         pickle.dump(vectorizer, open("vectorizer.pkl", "wb"))
         pickle.dump(label_encoder, open("label_encoder.pkl", "wb"))
+        export_bundle(model, vectorizer, label_encoder)
         print("✅ Model and assets saved successfully!")
     except Exception as e:
         print(f"❌ Error saving model: {e}")
@@ -127,7 +176,15 @@ def load_model():
         return None, None, None
 
 # ✅ **Search Papers in Dataset**
-def search_papers(query, file_path, max_results=5):
+def search_papers(query, file_path, max_results=5, index_dir=DEFAULT_INDEX_DIR):
+    # Use the prebuilt inverted index when available (python paper_index.py build <snapshot>)
+    index = load_index(index_dir, file_path=file_path)
+    if index is not None and not index.is_stale():
+        hits = index.search(query, k=max_results)
+        return index.fetch([doc_id for doc_id, _ in hits])
+    if index is not None:
+        print("⚠️ Paper index does not match the dataset, falling back to a full scan. Rebuild it!")
+
     results = []
     query_lower = query.lower()
 
@@ -165,10 +222,22 @@ def search_papers(query, file_path, max_results=5):
 
 # ✅ **Main Execution**
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the arXiv category classifier.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Train out-of-core over the full CS subset with HashingVectorizer + SGD")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
     print("🚀 Starting Backend Process...")
 
-    # Load Dataset
-    texts, labels = load_dataset(file_path)
+    if args.streaming:
+        model, vectorizer, label_encoder = train_streaming_classifier(file_path, batch_size=args.batch_size)
+        save_model(model, vectorizer, label_encoder)
+        print("🎯 Backend setup complete!")
+        exit(0)
+
+    # Load Dataset (stop reading once every class has enough samples for balancing)
+    texts, labels = load_dataset(file_path, max_per_class=800)
 
     # If dataset is empty, stop execution
     if not texts:
@@ -1,5 +1,6 @@
 import streamlit as st
 import asyncio
+import os
 import pickle
 import time
 import numpy as np
@@ -8,11 +9,30 @@ from langchain.prompts import ChatPromptTemplate
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.preprocessing import LabelEncoder
 from sklearn.naive_bayes import MultinomialNB
+from model_bundle import DEFAULT_BUNDLE_DIR, export_bundle, load_bundle
+from semantic_index import DEFAULT_SEMANTIC_DIR, load_semantic_index
+from response_cache import ResponseCache, replay_chunks
+from stream_metrics import StreamMetrics, iterate, log_metrics, stream_to_placeholder
 
-# Load trained model and assets
-vectorizer = pickle.load(open("vectorizer.pkl", "rb"))
-label_encoder = pickle.load(open("label_encoder.pkl", "rb"))
-model = pickle.load(open("chatbot_model.pkl", "rb"))
+# Load trained classifier from the memory-mapped model bundle (once per process)
+@st.cache_resource(show_spinner=False)
+def load_classifier():
+    if not os.path.exists(os.path.join(DEFAULT_BUNDLE_DIR, "meta.json")):
+        # One-time migration from the legacy pickle artifacts
+        vectorizer = pickle.load(open("vectorizer.pkl", "rb"))
+        label_encoder = pickle.load(open("label_encoder.pkl", "rb"))
+        model = pickle.load(open("chatbot_model.pkl", "rb"))
+        export_bundle(model, vectorizer, label_encoder, DEFAULT_BUNDLE_DIR)
+    return load_bundle(DEFAULT_BUNDLE_DIR)
+
+classifier = load_classifier()
+
+# Semantic paper index used to ground answers (python semantic_index.py build <snapshot>)
+@st.cache_resource(show_spinner=False)
+def load_paper_retriever():
+    return load_semantic_index(DEFAULT_SEMANTIC_DIR)
+
+paper_retriever = load_paper_retriever()
 
 # Define available LLM models
 models = {
@@ -34,6 +54,13 @@ def load_llm(model_name):
 
 llm = load_llm(models[selected_model])
 
+# Persistent response cache shared by all reruns of this process
+@st.cache_resource(show_spinner=False)
+def load_response_cache():
+    return ResponseCache("response_cache.db", semantic_threshold=0.95)
+
+response_cache = load_response_cache()
+
 # System instruction for chatbot
 system_instruction = "You are an expert in computer science. Provide concise, well-structured, and engaging explanations."
 
@@ -43,25 +70,78 @@ prompt_template = ChatPromptTemplate.from_messages([
     ("user", "{question}")
 ])
 
+# Prompt template used when related arXiv papers were retrieved
+grounded_system_instruction = system_instruction + " Use the related arXiv papers below when they are relevant and cite them by arXiv id."
+grounded_prompt_template = ChatPromptTemplate.from_messages([
+    ("system", grounded_system_instruction),
+    ("user", "Related papers:\n{context}\n\nQuestion: {question}")
+])
+
+# Retrieve top-k related papers from the semantic index
+def retrieve_papers(topic, k=3):
+    if paper_retriever is None:
+        return []
+    hits = paper_retriever.search(topic, k=k)
+    return paper_retriever.fetch([doc_id for doc_id, _ in hits])
+
+def format_context(papers, max_abstract_chars=600):
+    return "\n\n".join(
+        f"[{paper['id']}] {paper['title']}\n{(paper['abstract'] or '').strip()[:max_abstract_chars]}"
+        for paper in papers
+    )
+
+# Cache context for the prompt actually sent: an answer grounded in one set of papers
+# must not be replayed next to a different set (or next to none)
+def cache_context(papers):
+    if not papers:
+        return system_instruction
+    return grounded_system_instruction + "\nPapers: " + ",".join(sorted(paper["id"] for paper in papers))
+
 # Async function to generate response
-async def generate_response(topic):
-    response = ""
-    async for chunk in llm.astream(prompt_template.format(question=topic)):
-        response += chunk
-        yield response
+async def generate_response(topic, papers=None):
+    if papers:
+        prompt = grounded_prompt_template.format(question=topic, context=format_context(papers))
+    else:
+        prompt = prompt_template.format(question=topic)
+    async for chunk in llm.astream(prompt):
+        yield chunk
 
 async def main_async(topic):
     start_time = time.time()
     with st.spinner("Generating response..."):
+        retrieval_start = time.time()
+        papers = retrieve_papers(topic)
+        retrieval_time = time.time() - retrieval_start
+        if papers:
+            st.subheader("📚 Related Papers:")
+            for paper in papers:
+                st.write(f"**{paper['title']}** ({paper['id']})")
+
         st.subheader("📝 Generated Response:")
         response_placeholder = st.empty()
 
-        async for response in generate_response(topic):
-            response_placeholder.write(response)
+        # Replay a cached answer through the same placeholder, otherwise stream from the LLM
+        context_key = cache_context(papers)
+        cached_response, cache_kind = response_cache.get(models[selected_model], context_key, topic)
+        if cached_response is not None:
+            metrics = StreamMetrics(model=selected_model, source=f"cache-{cache_kind}")
+            await stream_to_placeholder(iterate(replay_chunks(cached_response)), response_placeholder, metrics)
+        else:
+            metrics = StreamMetrics(model=selected_model)
+            response = await stream_to_placeholder(generate_response(topic, papers), response_placeholder, metrics)
+            if response:
+                response_cache.put(models[selected_model], context_key, topic, response)
+        log_metrics(metrics)
 
         execution_time = time.time() - start_time
+        cache_stats = response_cache.stats()
         st.subheader("📊 Performance Metrics:")
         st.write(f"⏱ Response Time: {execution_time:.2f} seconds")
+        st.write(metrics.summary_line())
+        st.write(f"🗄 Cache: {cache_kind or 'miss'} | Hit rate: {cache_stats['hit_rate']:.0%} "
+                 f"({cache_stats['hits']} hits / {cache_stats['misses']} misses, {cache_stats['entries']} cached)")
+        if paper_retriever is not None:
+            st.write(f"🔎 Retrieval Time: {retrieval_time * 1000:.1f} ms")
         st.write(f"🤖 Model Used: {selected_model}")
 
 # Run async query
@@ -79,9 +159,7 @@ if st.button("Generate Response", key="chat_button"):
     if input_text.strip():
         try:
             # Predict category
-            query_vectorized = vectorizer.transform([input_text.strip()])
-            predicted_label = model.predict(query_vectorized)[0]
-            predicted_category = label_encoder.inverse_transform([predicted_label])[0]
+            predicted_category = classifier.predict([input_text.strip()])[0]
 
             st.write(f"📌 Predicted Category: {predicted_category}")
             run_async_query(input_text.strip())
@@ -0,0 +1,138 @@
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from model_bundle import DEFAULT_BUNDLE_DIR, load_bundle
+
+_worker_bundle = None
+
+
+def _init_worker(bundle_dir):
+    # Each worker memory-maps the same bundle files, so the arrays are shared via the page cache
+    global _worker_bundle
+    _worker_bundle = load_bundle(bundle_dir)
+
+
+def _classify_in_worker(texts, top_k):
+    return classify_texts(_worker_bundle, texts, top_k)
+
+
+def top_k_categories(probs, labels, top_k):
+    """Returns the top_k (category, probability) pairs for every row of probs."""
+    top_k = min(top_k, probs.shape[1])
+    if top_k < probs.shape[1]:
+        top = np.argpartition(-probs, top_k - 1, axis=1)[:, :top_k]
+    else:
+        top = np.tile(np.arange(probs.shape[1]), (probs.shape[0], 1))
+    top_probs = np.take_along_axis(probs, top, axis=1)
+    order = np.argsort(-top_probs, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_probs = np.take_along_axis(top_probs, order, axis=1)
+    return [[(str(labels[c]), float(p)) for c, p in zip(row, row_probs)] for row, row_probs in zip(top, top_probs)]
+
+
+def classify_texts(bundle, texts, top_k=3):
+    """Scores one batch: a single sparse vectorization and one matrix multiply.
+
+    Blank texts keep their position with an empty prediction.
+    """
+    rows = [i for i, text in enumerate(texts) if text.strip()]
+    predictions = [[] for _ in texts]
+    if rows:
+        probs = bundle.predict_proba_matrix(bundle.transform([texts[i] for i in rows]))
+        for i, prediction in zip(rows, top_k_categories(probs, bundle.labels, top_k)):
+            predictions[i] = prediction
+    return predictions
+
+
+def _batches(texts, batch_size):
+    texts = iter(texts)
+    while True:
+        batch = list(islice(texts, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# ✅ **Batch Classification API**
+def classify_batch(texts, bundle_dir=DEFAULT_BUNDLE_DIR, top_k=3, batch_size=10000, workers=1):
+    """Yields the top_k (category, probability) list for every text, in input order.
+
+    ``texts`` can be any iterable (it is consumed lazily). With ``workers`` > 1,
+    batches are scored in a process pool with a bounded number in flight.
+    """
+    if workers <= 1:
+        bundle = load_bundle(bundle_dir)
+        for batch in _batches(texts, batch_size):
+            yield from classify_texts(bundle, batch, top_k)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(bundle_dir,)) as executor:
+        pending = deque()
+        for batch in _batches(texts, batch_size):
+            pending.append(executor.submit(_classify_in_worker, batch, top_k))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def read_texts(path, field=None):
+    """Reads one text per line, or the given field from a JSON-lines file (e.g. the arXiv snapshot).
+
+    Blank and malformed lines are yielded as "" so output line N always belongs to input line N.
+    """
+    file = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for number, line in enumerate(file, 1):
+            line = line.rstrip("\n")
+            if field and line.strip():
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    data = None
+                if not isinstance(data, dict):
+                    print(f"⚠️ {path}:{number}: not a JSON object, emitting an empty prediction", file=sys.stderr)
+                    yield ""
+                    continue
+                yield " ".join(str(data.get(name) or "") for name in field.split(","))
+            else:
+                yield line if line.strip() else ""
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tag texts with arXiv categories in batch.")
+    parser.add_argument("inputs", nargs="+", help="Text files (one text per line), JSON-lines files, or - for stdin")
+    parser.add_argument("--field", help="Comma-separated JSON fields to classify, e.g. title,abstract")
+    parser.add_argument("--bundle-dir", default=DEFAULT_BUNDLE_DIR)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("-o", "--output", help="Write JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    def all_texts():
+        for path in args.inputs:
+            yield from read_texts(path, args.field)
+
+    start_time = time.time()
+    count = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for prediction in classify_batch(all_texts(), args.bundle_dir, top_k=args.top_k,
+                                         batch_size=args.batch_size, workers=args.workers):
+            out.write(json.dumps([{"category": c, "probability": round(p, 4)} for c, p in prediction]) + "\n")
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.time() - start_time
+    print(f"✅ Classified {count} texts in {elapsed:.2f}s ({count / max(elapsed, 1e-9):,.0f} texts/s)", file=sys.stderr)
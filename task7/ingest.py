@@ -0,0 +1,142 @@
+import os
+import sys
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Map arXiv categories to broader groups; anything else is "Other CS"
+CATEGORY_MAP = {
+    "cs.AI": "Artificial Intelligence",
+    "cs.LG": "Machine Learning",
+    "cs.CL": "Computational Linguistics",
+    "cs.NE": "Neural Networks",
+    "cs.CV": "Computer Vision",
+    "cs.DS": "Data Science",
+    "cs.IR": "Information Retrieval",
+}
+DEFAULT_CATEGORY = "Other CS"
+ALL_CATEGORIES = tuple(CATEGORY_MAP.values()) + (DEFAULT_CATEGORY,)
+
+
+def parse_record(line, cs_only=False):
+    """Parses one snapshot line into (text, category).
+
+    Returns None for invalid JSON, and for non-CS papers when ``cs_only`` is set.
+    """
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    title = (data.get("title") or "").strip()
+    abstract = (data.get("abstract") or "").strip()
+    categories = (data.get("categories") or "").split()
+    if cs_only and not any(cat.startswith("cs.") for cat in categories):
+        return None
+    matched_category = next((CATEGORY_MAP[cat] for cat in categories if cat in CATEGORY_MAP), DEFAULT_CATEGORY)
+    return title + " " + abstract, matched_category
+
+
+def parse_chunk(lines, cs_only=False):
+    return [record for record in (parse_record(line, cs_only) for line in lines) if record]
+
+
+def read_chunks(file, chunk_lines):
+    chunk = []
+    for line in file:
+        chunk.append(line)
+        if len(chunk) >= chunk_lines:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if the platform can't tell)."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class IngestStats:
+    def __init__(self):
+        self.start_time = time.time()
+        self.lines = 0
+        self.records = 0
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start_time
+
+    @property
+    def records_per_second(self):
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+        peak = peak_rss_mb()
+        peak_text = f"{peak:.0f} MB" if peak is not None else "n/a"
+        print(f"📊 Ingested {self.records} records from {self.lines} lines in {self.elapsed:.1f}s "
+              f"| {self.records_per_second:,.0f} records/s | peak RSS {peak_text}")
+
+
+# ✅ **Streaming Ingestion with a Bounded Work Queue**
+def stream_records(file_path, max_records=None, max_per_class=None, chunk_lines=2000,
+                   workers=None, max_pending=None, stats=None, cs_only=False):
+    """Yields (text, category) pairs from the snapshot in file order.
+
+    Lines are read in chunks and parsed in a process pool, with at most
+    ``max_pending`` chunks in flight. Reading stops as soon as ``max_records``
+    records were yielded or every category reached ``max_per_class``.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    stats = stats if stats is not None else IngestStats()
+    class_counts = dict.fromkeys(ALL_CATEGORIES, 0)
+    full_classes = 0
+
+    executor = ProcessPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        with open(file_path, "rb") as file:
+            chunks = read_chunks(file, chunk_lines)
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    stats.lines += len(chunk)
+                    pending.append(executor.submit(parse_chunk, chunk, cs_only))
+                if not pending:
+                    return
+
+                for text, label in pending.popleft().result():
+                    if max_per_class is not None:
+                        if class_counts[label] >= max_per_class:
+                            continue
+                        class_counts[label] += 1
+                        if class_counts[label] == max_per_class:
+                            full_classes += 1
+                    stats.records += 1
+                    yield text, label
+
+                    if max_records is not None and stats.records >= max_records:
+                        return
+                    if max_per_class is not None and full_classes == len(class_counts):
+                        return
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
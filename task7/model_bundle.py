@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+
+# ✅ **Bundle Layout**
+# bundle_dir/
+#   meta.json      -> version, vectorizer kind + parameters, scoring mode
+#   vocab.npy      -> vocabulary terms, sorted (only for TF-IDF bundles)
+#   vocab_idx.npy  -> int32 feature column of each sorted term
+#   idf.npy        -> float32 IDF weight per feature
+#   coef.npy       -> float32 [n_classes, n_features] coefficient matrix
+#   intercept.npy  -> float32 [n_classes]
+#   labels.npy     -> category names, in coefficient row order
+# Every array is loaded with mmap_mode="r", so worker processes share the OS page cache.
+BUNDLE_VERSION = 1
+DEFAULT_BUNDLE_DIR = "model_bundle"
+TFIDF_PARAMS = ("lowercase", "token_pattern", "stop_words", "ngram_range", "analyzer", "strip_accents",
+                "sublinear_tf", "norm", "binary", "use_idf")
+HASHING_PARAMS = ("lowercase", "token_pattern", "stop_words", "ngram_range", "analyzer", "strip_accents",
+                  "n_features", "alternate_sign", "norm", "binary")
+
+
+def _scores_to_proba(scores, mode):
+    if scores.shape[1] == 1:
+        positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+        return np.column_stack([1.0 - positive, positive])
+    if mode == "softmax":
+        probs = np.exp(scores - scores.max(axis=1, keepdims=True))
+    else:
+        probs = 1.0 / (1.0 + np.exp(-scores))
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+def _scoring_mode(model, n_probe=8, seed=0):
+    """"softmax" or "ovr": whichever reproduces the model's own predict_proba on random probe rows.
+
+    Attributes such as a legacy multi_class="ovr" don't say what the installed
+    scikit-learn actually does, so the mode is measured rather than guessed.
+    """
+    if not hasattr(model, "predict_proba") or getattr(model, "loss", None) in ("hinge", "perceptron"):
+        return "ovr"
+    rng = np.random.default_rng(seed)
+    n_features = model.coef_.shape[1]
+    probe = sp.random(n_probe, n_features, density=min(1.0, 20 / n_features), format="csr", random_state=rng,
+                      dtype=np.float64)
+    expected = model.predict_proba(probe)
+    scores = np.asarray(probe @ model.coef_.T) + model.intercept_
+    errors = {mode: np.abs(_scores_to_proba(scores, mode) - expected).max() for mode in ("softmax", "ovr")}
+    mode = min(errors, key=errors.get)
+    if errors[mode] > 1e-4:
+        print(f"⚠️ Bundle probabilities differ from the model's by up to {errors[mode]:.4f} ({mode} scoring)")
+    return mode
+
+
+def _json_param(value):
+    if isinstance(value, (frozenset, set)):
+        return sorted(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+# ✅ **Export Trained Model to a Bundle**
+def export_bundle(model, vectorizer, label_encoder, bundle_dir=DEFAULT_BUNDLE_DIR):
+    os.makedirs(bundle_dir, exist_ok=True)
+    params = vectorizer.get_params()
+
+    if isinstance(vectorizer, HashingVectorizer):
+        kind = "hashing"
+        kept = {name: _json_param(params[name]) for name in HASHING_PARAMS}
+    else:
+        kind = "tfidf"
+        kept = {name: _json_param(params[name]) for name in TFIDF_PARAMS}
+        terms = np.array(sorted(vectorizer.vocabulary_))
+        np.save(os.path.join(bundle_dir, "vocab.npy"), terms)
+        np.save(os.path.join(bundle_dir, "vocab_idx.npy"),
+                np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int32))
+        np.save(os.path.join(bundle_dir, "idf.npy"), vectorizer.idf_.astype(np.float32))
+
+    if kept.get("analyzer") not in ("word", "char", "char_wb"):
+        raise ValueError("Only built-in analyzers can be exported to a model bundle")
+
+    # Coefficient rows follow model.classes_, which are encoded label ids
+    labels = label_encoder.inverse_transform(model.classes_)
+    np.save(os.path.join(bundle_dir, "coef.npy"), np.ascontiguousarray(model.coef_, dtype=np.float32))
+    np.save(os.path.join(bundle_dir, "intercept.npy"), np.asarray(model.intercept_, dtype=np.float32))
+    np.save(os.path.join(bundle_dir, "labels.npy"), np.asarray(labels).astype(str))
+
+    meta = {
+        "version": BUNDLE_VERSION,
+        "kind": kind,
+        "vectorizer": kept,
+        "scoring": _scoring_mode(model),
+        "n_features": int(model.coef_.shape[1]),
+        "n_classes": len(labels),
+    }
+    # meta.json is written last: a bundle without it is incomplete and won't load
+    tmp_path = os.path.join(bundle_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    os.replace(tmp_path, os.path.join(bundle_dir, "meta.json"))
+    print(f"✅ Model bundle exported to {bundle_dir}/ ({meta['n_classes']} classes, {meta['n_features']} features)")
+    return meta
+
+
+# ✅ **Memory-Mapped Classifier**
+class ModelBundle:
+    def __init__(self, bundle_dir=DEFAULT_BUNDLE_DIR):
+        meta_path = os.path.join(bundle_dir, "meta.json")
+        with open(meta_path, "r", encoding="utf-8") as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported model bundle version {self.meta.get('version')} "
+                             f"(expected {BUNDLE_VERSION}). Re-export it with model_bundle.py export.")
+
+        def load(name):
+            return np.load(os.path.join(bundle_dir, name), mmap_mode="r")
+
+        self.kind = self.meta["kind"]
+        self.coef = load("coef.npy")
+        self.intercept = load("intercept.npy")
+        self.labels = load("labels.npy")
+        self.n_features = self.meta["n_features"]
+        params = dict(self.meta["vectorizer"])
+        if params.get("ngram_range") is not None:
+            params["ngram_range"] = tuple(params["ngram_range"])
+
+        if self.kind == "hashing":
+            self._hasher = HashingVectorizer(**params)
+        else:
+            self.vocab = load("vocab.npy")
+            self.vocab_idx = load("vocab_idx.npy")
+            self.idf = load("idf.npy")
+            self.sublinear_tf = params.pop("sublinear_tf")
+            self.norm = params.pop("norm")
+            self.binary = params.pop("binary")
+            self.use_idf = params.pop("use_idf")
+            # An unfitted vectorizer is only used for its tokenizer/analyzer
+            self._analyzer = TfidfVectorizer(**params).build_analyzer()
+
+    def transform(self, texts):
+        """Vectorizes texts into a CSR matrix identical to the exported vectorizer's output."""
+        if self.kind == "hashing":
+            return self._hasher.transform(texts)
+
+        # Map every token of the batch to a batch-local id, then resolve all
+        # distinct tokens against the sorted vocabulary with one searchsorted.
+        local_ids, rows, token_ids = {}, [], []
+        n_texts = 0
+        for row, text in enumerate(texts):
+            n_texts += 1
+            for token in self._analyzer(text):
+                rows.append(row)
+                token_ids.append(local_ids.setdefault(token, len(local_ids)))
+
+        columns = np.full(len(local_ids), -1, dtype=np.int64)
+        if local_ids and len(self.vocab):
+            distinct = np.array(list(local_ids))
+            positions = np.searchsorted(self.vocab, distinct)
+            positions[positions >= len(self.vocab)] = 0
+            known = self.vocab[positions] == distinct
+            columns[known] = self.vocab_idx[positions[known]]
+
+        token_columns = columns[np.asarray(token_ids, dtype=np.int64)]
+        in_vocab = token_columns >= 0
+        # COO -> CSR sums duplicate (row, column) pairs into term counts
+        X = sp.coo_matrix(
+            (np.ones(int(in_vocab.sum()), dtype=np.float32),
+             (np.asarray(rows, dtype=np.int64)[in_vocab], token_columns[in_vocab])),
+            shape=(n_texts, self.n_features),
+        ).tocsr()
+        X.sort_indices()
+        if self.binary:
+            X.data[:] = 1.0
+        elif self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.use_idf:
+            X = X.multiply(self.idf).tocsr()
+        if self.norm == "l2":
+            row_norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+            row_norms[row_norms == 0] = 1.0
+            X = sp.diags(1.0 / row_norms) @ X
+        elif self.norm == "l1":
+            row_norms = np.asarray(abs(X).sum(axis=1)).ravel()
+            row_norms[row_norms == 0] = 1.0
+            X = sp.diags(1.0 / row_norms) @ X
+        return X.tocsr()
+
+    def decision_function(self, X):
+        return np.asarray(X @ self.coef.T) + self.intercept
+
+    def predict_proba_matrix(self, X):
+        return _scores_to_proba(self.decision_function(X), self.meta["scoring"])
+
+    def predict_proba(self, texts):
+        return self.predict_proba_matrix(self.transform(texts))
+
+    def predict(self, texts):
+        """Returns the predicted category name for every text."""
+        return [str(self.labels[i]) for i in self.predict_proba(texts).argmax(axis=1)]
+
+
+def load_bundle(bundle_dir=DEFAULT_BUNDLE_DIR):
+    return ModelBundle(bundle_dir)
+
+
+def _load_pickles(model_path, vectorizer_path, label_encoder_path):
+    model = pickle.load(open(model_path, "rb"))
+    vectorizer = pickle.load(open(vectorizer_path, "rb"))
+    label_encoder = pickle.load(open(label_encoder_path, "rb"))
+    return model, vectorizer, label_encoder
+
+
+# ✅ **Startup Benchmark: pickles vs. bundle**
+def benchmark(bundle_dir=DEFAULT_BUNDLE_DIR, model_path="chatbot_model.pkl", vectorizer_path="vectorizer.pkl",
+              label_encoder_path="label_encoder.pkl", repeats=5, sample_texts=None):
+    sample_texts = sample_texts or [
+        "graph neural networks for molecule property prediction",
+        "a survey of transformer models for machine translation",
+        "convolutional networks for image segmentation",
+    ]
+
+    pickle_times, bundle_times = [], []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        model, vectorizer, label_encoder = _load_pickles(model_path, vectorizer_path, label_encoder_path)
+        pickle_times.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        bundle = load_bundle(bundle_dir)
+        bundle_times.append(time.perf_counter() - start_time)
+
+    pickle_labels = label_encoder.inverse_transform(model.predict(vectorizer.transform(sample_texts)))
+    bundle_labels = bundle.predict(sample_texts)
+    agreement = np.mean([a == b for a, b in zip(pickle_labels, bundle_labels)])
+
+    print("📊 Startup time (median of {} loads)".format(repeats))
+    print(f"   pickle : {np.median(pickle_times) * 1000:8.2f} ms")
+    print(f"   bundle : {np.median(bundle_times) * 1000:8.2f} ms")
+    print(f"   prediction agreement on sample texts: {agreement:.0%}")
+    return {"pickle_ms": np.median(pickle_times) * 1000, "bundle_ms": np.median(bundle_times) * 1000,
+            "agreement": agreement}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export, validate and benchmark the task7 model bundle.")
+    parser.add_argument("command", choices=["export", "benchmark"])
+    parser.add_argument("--bundle-dir", default=DEFAULT_BUNDLE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_bundle(*_load_pickles("chatbot_model.pkl", "vectorizer.pkl", "label_encoder.pkl"), args.bundle_dir)
+    else:
+        benchmark(args.bundle_dir)
@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import time
+import heapq
+import pickle
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from collections import defaultdict
+
+# ✅ **Index Layout**
+# index_dir/
+#   meta.json     -> version, document count, average length, snapshot fingerprint
+#   terms.txt     -> one term per line, sorted (line number == term id)
+#   lexicon.npy   -> int64 [n_terms, 2] = (postings start, document frequency)
+#   docs.u32      -> postings doc ids, grouped by term, ascending
+#   tfs.u16       -> term frequencies, aligned with docs.u32
+#   offsets.npy   -> uint64 byte offset of every record in the snapshot
+#   doclen.npy    -> uint32 token count of every record
+INDEX_VERSION = 1
+DEFAULT_INDEX_DIR = "paper_index"
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-][a-z0-9]+)*")
+INDEXED_FIELDS = ("title", "abstract", "categories")
+RECORD_FIELDS = ("id", "title", "authors", "categories", "abstract", "doi", "update_date")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _snapshot_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+# ✅ **Spill One In-Memory Block as a Sorted Run**
+def _write_run(block, run_dir, run_no):
+    run_path = os.path.join(run_dir, f"run_{run_no:05d}.pkl")
+    with open(run_path, "wb") as run_file:
+        for term in sorted(block):
+            docs, tfs = block[term]
+            pickle.dump(
+                (term, np.asarray(docs, dtype=np.uint32), np.asarray(tfs, dtype=np.uint16)),
+                run_file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+    return run_path
+
+
+def _read_run(run_path, run_no):
+    with open(run_path, "rb") as run_file:
+        while True:
+            try:
+                term, docs, tfs = pickle.load(run_file)
+            except EOFError:
+                return
+            # run_no breaks ties between runs so postings arrays are never compared
+            yield term, run_no, docs, tfs
+
+
+# ✅ **Build the On-Disk Inverted Index (one pass over the snapshot)**
+def build_index(file_path, index_dir=DEFAULT_INDEX_DIR, block_docs=200_000):
+    """Builds a BM25 inverted index over title, abstract and categories.
+
+    Postings are accumulated in blocks of ``block_docs`` records, spilled to
+    sorted runs and k-way merged, so memory stays bounded by the block size.
+    """
+    start_time = time.time()
+    os.makedirs(index_dir, exist_ok=True)
+    run_dir = tempfile.mkdtemp(prefix="runs_", dir=index_dir)
+    runs, offsets, doc_lens = [], [], []
+    block = defaultdict(lambda: ([], []))
+    block_count = 0
+
+    with open(file_path, "rb") as file:
+        offset = 0
+        for line in file:
+            line_offset = offset
+            offset += len(line)
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            tokens = []
+            for field in INDEXED_FIELDS:
+                tokens.extend(tokenize(data.get(field) or ""))
+
+            doc_id = len(offsets)
+            offsets.append(line_offset)
+            doc_lens.append(len(tokens))
+
+            term_freqs = defaultdict(int)
+            for token in tokens:
+                term_freqs[token] += 1
+            for term, tf in term_freqs.items():
+                docs, tfs = block[term]
+                docs.append(doc_id)
+                tfs.append(min(tf, 65535))
+
+            block_count += 1
+            if block_count >= block_docs:
+                runs.append(_write_run(block, run_dir, len(runs)))
+                block = defaultdict(lambda: ([], []))
+                block_count = 0
+
+    if block:
+        runs.append(_write_run(block, run_dir, len(runs)))
+
+    # Runs hold increasing doc id ranges, so concatenating them in run order
+    # keeps every merged postings list sorted by doc id.
+    terms, lexicon = [], []
+    position = 0
+    merged = heapq.merge(*[_read_run(path, run_no) for run_no, path in enumerate(runs)])
+    with open(os.path.join(index_dir, "docs.u32"), "wb") as docs_file, \
+            open(os.path.join(index_dir, "tfs.u16"), "wb") as tfs_file:
+        current_term, df = None, 0
+        for term, _, docs, tfs in merged:
+            if term != current_term:
+                if current_term is not None:
+                    terms.append(current_term)
+                    lexicon.append((position - df, df))
+                current_term, df = term, 0
+            docs_file.write(docs.tobytes())
+            tfs_file.write(tfs.tobytes())
+            df += len(docs)
+            position += len(docs)
+        if current_term is not None:
+            terms.append(current_term)
+            lexicon.append((position - df, df))
+
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+    with open(os.path.join(index_dir, "terms.txt"), "w", encoding="utf-8") as terms_file:
+        terms_file.write("\n".join(terms))
+    np.save(os.path.join(index_dir, "lexicon.npy"), np.asarray(lexicon, dtype=np.int64).reshape(-1, 2))
+    np.save(os.path.join(index_dir, "offsets.npy"), np.asarray(offsets, dtype=np.uint64))
+    np.save(os.path.join(index_dir, "doclen.npy"), np.asarray(doc_lens, dtype=np.uint32))
+
+    meta = {
+        "version": INDEX_VERSION,
+        "n_docs": len(offsets),
+        "n_terms": len(terms),
+        "n_postings": position,
+        "avgdl": float(np.mean(doc_lens)) if doc_lens else 0.0,
+        "snapshot": _snapshot_fingerprint(file_path),
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+
+    print(f"✅ Index built: {meta['n_docs']} papers, {meta['n_terms']} terms, "
+          f"{position} postings in {time.time() - start_time:.1f}s")
+    return meta
+
+
+# ✅ **Query-Time Index (memory-mapped postings + BM25)**
+class PaperIndex:
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, file_path=None, k1=1.2, b=0.75):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version {self.meta.get('version')} (expected {INDEX_VERSION})")
+
+        self.file_path = file_path or self.meta["snapshot"]["path"]
+        self.k1, self.b = k1, b
+        self.n_docs = self.meta["n_docs"]
+        self.avgdl = self.meta["avgdl"] or 1.0
+
+        with open(os.path.join(index_dir, "terms.txt"), "r", encoding="utf-8") as terms_file:
+            self.term_ids = {term: i for i, term in enumerate(terms_file.read().split("\n")) if term}
+        self.lexicon = np.load(os.path.join(index_dir, "lexicon.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+        self.doc_lens = np.load(os.path.join(index_dir, "doclen.npy"), mmap_mode="r")
+        n_postings = self.meta["n_postings"]
+        self.docs = np.memmap(os.path.join(index_dir, "docs.u32"), dtype=np.uint32, mode="r", shape=(n_postings,)) \
+            if n_postings else np.empty(0, dtype=np.uint32)
+        self.tfs = np.memmap(os.path.join(index_dir, "tfs.u16"), dtype=np.uint16, mode="r", shape=(n_postings,)) \
+            if n_postings else np.empty(0, dtype=np.uint16)
+
+    def is_stale(self):
+        """True when the snapshot on disk no longer matches the one that was indexed."""
+        try:
+            current = _snapshot_fingerprint(self.file_path)
+        except FileNotFoundError:
+            return True
+        indexed = self.meta["snapshot"]
+        return current["size"] != indexed["size"] or current["mtime"] != indexed["mtime"]
+
+    def search(self, query, k=5):
+        """Returns up to ``k`` (doc_id, score) pairs ranked by BM25."""
+        term_ids = {self.term_ids[t] for t in tokenize(query) if t in self.term_ids}
+        if not term_ids:
+            return []
+
+        doc_parts, score_parts = [], []
+        for term_id in term_ids:
+            start, df = self.lexicon[term_id]
+            docs = np.asarray(self.docs[start:start + df])
+            tfs = np.asarray(self.tfs[start:start + df], dtype=np.float32)
+            idf = np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * self.doc_lens[docs] / self.avgdl)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+
+        # Only documents that contain at least one query term are scored.
+        candidates, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def fetch(self, doc_ids):
+        """Seeks straight to each record in the snapshot and returns the paper dicts."""
+        papers = []
+        with open(self.file_path, "rb") as file:
+            for doc_id in doc_ids:
+                file.seek(int(self.offsets[doc_id]))
+                data = json.loads(file.readline())
+                papers.append({field: data.get(field) for field in RECORD_FIELDS})
+        return papers
+
+
+_loaded_indexes = {}
+
+
+def load_index(index_dir=DEFAULT_INDEX_DIR, file_path=None):
+    """Loads an index once per process; returns None if it has not been built."""
+    key = (os.path.abspath(index_dir), file_path)
+    if key not in _loaded_indexes:
+        if not os.path.exists(os.path.join(index_dir, "meta.json")):
+            return None
+        _loaded_indexes[key] = PaperIndex(index_dir, file_path=file_path)
+    return _loaded_indexes[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or query the arXiv paper index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the inverted index from the snapshot")
+    build_parser.add_argument("snapshot", help="Path to arxiv-metadata-oai-snapshot.json")
+    build_parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    build_parser.add_argument("--block-docs", type=int, default=200_000)
+
+    search_parser = subparsers.add_parser("search", help="Query an existing index")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--index-dir", default=DEFAULT_INDEX_DIR)
+    search_parser.add_argument("-k", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_index(args.snapshot, args.index_dir, block_docs=args.block_docs)
+    else:
+        index = PaperIndex(args.index_dir)
+        start_time = time.time()
+        hits = index.search(args.query, k=args.k)
+        papers = index.fetch([doc_id for doc_id, _ in hits])
+        print(f"⏱ {len(papers)} results in {(time.time() - start_time) * 1000:.1f} ms")
+        for (_, score), paper in zip(hits, papers):
+            print(f"{score:7.3f}  {paper['id']}  {paper['title']}")
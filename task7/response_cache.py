@@ -0,0 +1,214 @@
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+# ✅ **Persistent LLM Response Cache**
+# Entries are keyed on (model, system prompt, normalized query) and kept in SQLite,
+# so they survive Streamlit reruns and restarts. Optionally, a query that is only
+# a rephrasing of a cached one is served through a similarity lookup over its
+# content words (filler words dropped, plurals folded). A rephrasing only counts
+# if the two sets of content words overlap by at least MIN_CONTENT_OVERLAP
+# (Jaccard), every number matches exactly, and the embeddings are within the
+# cosine threshold: "world war 1" vs "world war 2" or "sort a list in python" vs
+# "sort a list in java" embed close together but need different answers.
+# Keep in sync: task2/response_cache.py and task7/response_cache.py are the same file.
+EMBEDDING_DIM = 512
+MIN_CONTENT_OVERLAP = 0.8
+STOPWORDS = frozenset(
+    "a an the is are was were be of in on at to for from by into and or with about what whats how does do did "
+    "which who this that these those can could please tell me explain describe".split()
+)
+
+
+def normalize_query(query):
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip(" ?!.")
+
+
+def cache_key(model, system_prompt, query):
+    raw = "\0".join((model, system_prompt, normalize_query(query)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def content_words(query):
+    """Content words (numbers included) in order, without filler words; plural "s" dropped."""
+    words = []
+    for token in re.findall(r"\w+", normalize_query(query)):
+        if token not in STOPWORDS:
+            words.append(token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token)
+    return words
+
+
+def same_content(query_a, query_b, min_overlap=MIN_CONTENT_OVERLAP):
+    """True when two queries share nearly all content words and exactly the same numbers."""
+    words_a, words_b = set(content_words(query_a)), set(content_words(query_b))
+    numbers_a = {word for word in words_a if any(ch.isdigit() for ch in word)}
+    numbers_b = {word for word in words_b if any(ch.isdigit() for ch in word)}
+    if numbers_a != numbers_b or not words_a or not words_b:
+        return False
+    return len(words_a & words_b) / len(words_a | words_b) >= min_overlap
+
+
+def embed_query(query, dim=EMBEDDING_DIM):
+    """Cheap local embedding of the content words: hashed word + character-trigram counts, L2-normalized."""
+    text = " ".join(content_words(query))
+    features = re.findall(r"\w+", text)
+    padded = f" {text} "
+    features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features:
+        digest = hashlib.md5(feature.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class ResponseCache:
+    def __init__(self, db_path="response_cache.db", max_entries=1000, max_bytes=50 * 1024 * 1024,
+                 ttl_seconds=7 * 24 * 3600, semantic_threshold=None):
+        """``semantic_threshold`` (cosine, e.g. 0.95) enables near-duplicate lookup; None disables it."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                system_prompt TEXT NOT NULL,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                embedding BLOB,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+        self._conn.commit()
+
+    def _expire(self, now):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+
+    def _evict(self):
+        # Drop least recently used entries until both caps are respected
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            count, total = count - 1, total - row[1]
+
+    def get(self, model, system_prompt, query):
+        """Returns (response, kind) where kind is "exact", "semantic" or None on a miss."""
+        now = time.time()
+        key = cache_key(model, system_prompt, query)
+        with self._lock:
+            self._expire(now)
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            kind = "exact" if row else None
+
+            if row is None and self.semantic_threshold is not None:
+                candidates = [
+                    c for c in self._conn.execute(
+                        "SELECT key, response, embedding, query FROM responses WHERE model = ? AND system_prompt = ?",
+                        (model, system_prompt),
+                    ).fetchall()
+                    if same_content(c[3], query)
+                ]
+                if candidates:
+                    matrix = np.frombuffer(b"".join(c[2] for c in candidates), dtype=np.float32)
+                    similarities = matrix.reshape(len(candidates), -1) @ embed_query(query)
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.semantic_threshold:
+                        key, row, kind = candidates[best][0], (candidates[best][1],), "semantic"
+
+            if row is None:
+                self.misses += 1
+                self._conn.commit()
+                return None, None
+
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            if kind == "semantic":
+                self.semantic_hits += 1
+            return row[0], kind
+
+    def put(self, model, system_prompt, query, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(model, system_prompt, query), model, system_prompt, normalize_query(query), response,
+                 embed_query(query).tobytes(), size, now, now),
+            )
+            self._expire(now)
+            self._evict()
+            self._conn.commit()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "semantic_hits": self.semantic_hits, "misses": self.misses,
+                "hit_rate": self.hit_rate, "entries": entries, "bytes": total}
+
+
+def replay_chunks(text, chunk_chars=40):
+    """Splits a cached response into chunks so it renders like a live stream."""
+    for start in range(0, len(text), chunk_chars):
+        yield text[start:start + chunk_chars]
+
+
+# ✅ **Near-miss Check (python response_cache.py)**
+# Pairs that must never share a cached answer, and rephrasings that should.
+NEAR_MISSES = [
+    ("causes of world war 1", "causes of world war 2"),
+    ("how to sort a list in python", "how to sort a list in java"),
+    ("what is gradient descent", "what is stochastic gradient descent"),
+    ("top 5 sorting algorithms", "top 10 sorting algorithms"),
+    ("symptoms of type 1 diabetes", "symptoms of type 2 diabetes"),
+    ("papers on bert for question answering", "papers on gpt for question answering"),
+]
+REPHRASINGS = [
+    ("explain transformer attention mechanisms in detail", "Describe in detail the attention mechanisms of transformers"),
+    ("how do transformers use attention", "How does the transformer use attention?"),
+    ("best papers on reinforcement learning for robotics", "best papers about reinforcement learning in robotics"),
+    ("recent advances in large language models", "What are the recent advances in large language models?"),
+]
+
+
+def check_near_misses(threshold=0.95):
+    failures = 0
+    for cached, asked, should_hit in [(a, b, False) for a, b in NEAR_MISSES] + [(a, b, True) for a, b in REPHRASINGS]:
+        cache = ResponseCache(":memory:", semantic_threshold=threshold)
+        cache.put("model", "system", cached, "answer")
+        hit = cache.get("model", "system", asked)[0] is not None
+        similarity = float(embed_query(cached) @ embed_query(asked))
+        ok = hit == should_hit
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {cached!r} -> {asked!r}: similarity {similarity:.3f}, "
+              f"{'hit' if hit else 'miss'} (expected {'hit' if should_hit else 'miss'})")
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if check_near_misses() else 0)
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import pickle
+import argparse
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import make_pipeline
+from ingest import parse_record, stream_records
+from paper_index import RECORD_FIELDS
+
+# ✅ **Index Layout**
+# index_dir/
+#   meta.json     -> version, dimensions, number of papers and IVF lists
+#   encoder.pkl   -> TF-IDF + TruncatedSVD (LSA) text encoder
+#   vectors.f32   -> float32 [n_docs, dim] L2-normalised embeddings, grouped by IVF list
+#   ids.npy       -> int64 paper number of every row in vectors.f32
+#   lists.npy     -> int64 [n_lists + 1] row range of every IVF list
+#   centroids.npy -> float32 [n_lists, dim] normalised IVF centroids
+#   offsets.npy   -> uint64 byte offset of every paper in the snapshot
+SEMANTIC_INDEX_VERSION = 1
+DEFAULT_SEMANTIC_DIR = "semantic_index"
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _iter_snapshot(file_path, cs_only):
+    """Yields (byte offset, text) for every usable record in the snapshot."""
+    with open(file_path, "rb") as file:
+        offset = 0
+        for line in file:
+            line_offset = offset
+            offset += len(line)
+            record = parse_record(line, cs_only)
+            if record:
+                yield line_offset, record[0]
+
+
+# ✅ **Build Embeddings + IVF Index**
+def build_semantic_index(file_path, index_dir=DEFAULT_SEMANTIC_DIR, dim=256, fit_sample=50000,
+                         n_lists=None, batch_size=10000, cs_only=True):
+    """Embeds every abstract with a locally fitted LSA encoder and builds an IVF index.
+
+    The encoder is fitted on the first ``fit_sample`` papers; embeddings are then
+    written batch by batch to a raw float32 file, so memory stays bounded.
+    """
+    start_time = time.time()
+    os.makedirs(index_dir, exist_ok=True)
+
+    sample = [text for text, _ in stream_records(file_path, max_records=fit_sample, cs_only=cs_only)]
+    vectorizer = TfidfVectorizer(max_features=100000, stop_words="english", sublinear_tf=True)
+    X_sample = vectorizer.fit_transform(sample)
+    dim = max(1, min(dim, X_sample.shape[1] - 1, len(sample) - 1))
+    svd = TruncatedSVD(n_components=dim, random_state=42).fit(X_sample)
+    encoder = make_pipeline(vectorizer, svd)
+    with open(os.path.join(index_dir, "encoder.pkl"), "wb") as encoder_file:
+        pickle.dump(encoder, encoder_file)
+    print(f"✅ Encoder fitted on {len(sample)} papers ({dim} dimensions)")
+
+    raw_path = os.path.join(index_dir, "vectors.raw.f32")
+    offsets, batch_offsets, batch_texts = [], [], []
+    with open(raw_path, "wb") as raw_file:
+        def flush():
+            raw_file.write(_normalize(encoder.transform(batch_texts)).tobytes())
+            offsets.extend(batch_offsets)
+            batch_offsets.clear()
+            batch_texts.clear()
+
+        for line_offset, text in _iter_snapshot(file_path, cs_only):
+            batch_offsets.append(line_offset)
+            batch_texts.append(text)
+            if len(batch_texts) >= batch_size:
+                flush()
+        if batch_texts:
+            flush()
+
+    n_docs = len(offsets)
+    vectors = np.memmap(raw_path, dtype=np.float32, mode="r", shape=(n_docs, dim))
+
+    # Coarse quantizer: k-means over a sample, ~sqrt(N) lists
+    n_lists = n_lists or max(1, int(np.sqrt(n_docs)))
+    n_lists = min(n_lists, n_docs)
+    rng = np.random.default_rng(42)
+    train_rows = np.sort(rng.choice(n_docs, size=min(n_docs, max(256 * n_lists, 10000)), replace=False))
+    kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=42, batch_size=4096, n_init=3)
+    kmeans.fit(vectors[train_rows])
+    centroids = _normalize(kmeans.cluster_centers_)
+
+    assignments = np.empty(n_docs, dtype=np.int32)
+    for start in range(0, n_docs, batch_size):
+        assignments[start:start + batch_size] = np.argmax(vectors[start:start + batch_size] @ centroids.T, axis=1)
+    ids = np.argsort(assignments, kind="stable")
+    lists = np.zeros(n_lists + 1, dtype=np.int64)
+    lists[1:] = np.cumsum(np.bincount(assignments, minlength=n_lists))
+
+    # Rewrite vectors grouped by list so every probe scans one contiguous block
+    with open(os.path.join(index_dir, "vectors.f32"), "wb") as vectors_file:
+        for start in range(0, n_docs, batch_size):
+            vectors_file.write(np.ascontiguousarray(vectors[ids[start:start + batch_size]]).tobytes())
+    del vectors
+    os.remove(raw_path)
+
+    np.save(os.path.join(index_dir, "ids.npy"), ids.astype(np.int64))
+    np.save(os.path.join(index_dir, "lists.npy"), lists)
+    np.save(os.path.join(index_dir, "centroids.npy"), centroids)
+    np.save(os.path.join(index_dir, "offsets.npy"), np.asarray(offsets, dtype=np.uint64))
+    meta = {
+        "version": SEMANTIC_INDEX_VERSION,
+        "dim": dim,
+        "n_docs": n_docs,
+        "n_lists": n_lists,
+        "snapshot": os.path.abspath(file_path),
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file, indent=2)
+    print(f"✅ Semantic index built: {n_docs} papers, {n_lists} IVF lists in {time.time() - start_time:.1f}s")
+    return meta
+
+
+# ✅ **Query-Time IVF Search**
+class SemanticIndex:
+    def __init__(self, index_dir=DEFAULT_SEMANTIC_DIR, file_path=None, nprobe=8):
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get("version") != SEMANTIC_INDEX_VERSION:
+            raise ValueError(f"Unsupported semantic index version {self.meta.get('version')}")
+
+        self.file_path = file_path or self.meta["snapshot"]
+        self.nprobe = nprobe
+        with open(os.path.join(index_dir, "encoder.pkl"), "rb") as encoder_file:
+            self.encoder = pickle.load(encoder_file)
+        self.vectors = np.memmap(os.path.join(index_dir, "vectors.f32"), dtype=np.float32, mode="r",
+                                 shape=(self.meta["n_docs"], self.meta["dim"]))
+        self.ids = np.load(os.path.join(index_dir, "ids.npy"), mmap_mode="r")
+        self.lists = np.load(os.path.join(index_dir, "lists.npy"))
+        self.centroids = np.load(os.path.join(index_dir, "centroids.npy"))
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+
+    def encode(self, texts):
+        return _normalize(self.encoder.transform(texts))
+
+    @staticmethod
+    def _top_k(scores, k):
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def search_vector(self, query_vector, k=5, nprobe=None):
+        """IVF search: score only the ``nprobe`` lists whose centroids are closest to the query."""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        probe = self._top_k(self.centroids @ query_vector, nprobe)
+        rows = np.concatenate([np.arange(self.lists[i], self.lists[i + 1]) for i in probe])
+        if not len(rows):
+            return []
+        scores = np.concatenate([self.vectors[self.lists[i]:self.lists[i + 1]] @ query_vector for i in probe])
+        top = self._top_k(scores, k)
+        return [(int(self.ids[rows[i]]), float(scores[i])) for i in top]
+
+    def brute_force_vector(self, query_vector, k=5, block_rows=200000):
+        """Exact search over every vector (used as ground truth for the benchmark)."""
+        scores = np.concatenate([self.vectors[start:start + block_rows] @ query_vector
+                                 for start in range(0, len(self.vectors), block_rows)])
+        top = self._top_k(scores, k)
+        return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+    def search(self, query, k=5, nprobe=None):
+        return self.search_vector(self.encode([query])[0], k=k, nprobe=nprobe)
+
+    def fetch(self, doc_ids):
+        papers = []
+        with open(self.file_path, "rb") as file:
+            for doc_id in doc_ids:
+                file.seek(int(self.offsets[doc_id]))
+                data = json.loads(file.readline())
+                papers.append({field: data.get(field) for field in RECORD_FIELDS})
+        return papers
+
+
+# ✅ **Recall@k vs. Latency Benchmark**
+def benchmark(index, queries, k=10, nprobes=(1, 2, 4, 8, 16, 32)):
+    query_vectors = index.encode(queries)
+
+    start_time = time.perf_counter()
+    truth = [{doc for doc, _ in index.brute_force_vector(q, k)} for q in query_vectors]
+    brute_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+    print(f"📊 Brute force: {brute_ms:8.2f} ms/query (recall@{k} = 1.000)")
+
+    results = {"brute_force_ms": brute_ms, "ivf": []}
+    for nprobe in nprobes:
+        if nprobe > len(index.centroids):
+            break
+        start_time = time.perf_counter()
+        found = [{doc for doc, _ in index.search_vector(q, k, nprobe)} for q in query_vectors]
+        ivf_ms = (time.perf_counter() - start_time) * 1000 / len(queries)
+        recall = np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)])
+        print(f"   nprobe={nprobe:<4d} {ivf_ms:8.2f} ms/query  recall@{k} = {recall:.3f}")
+        results["ivf"].append({"nprobe": nprobe, "ms_per_query": ivf_ms, "recall": recall})
+    return results
+
+
+_loaded_indexes = {}
+
+
+def load_semantic_index(index_dir=DEFAULT_SEMANTIC_DIR, file_path=None, nprobe=8):
+    """Loads the index once per process; returns None if it has not been built."""
+    key = (os.path.abspath(index_dir), file_path)
+    if key not in _loaded_indexes:
+        if not os.path.exists(os.path.join(index_dir, "meta.json")):
+            return None
+        _loaded_indexes[key] = SemanticIndex(index_dir, file_path=file_path, nprobe=nprobe)
+    return _loaded_indexes[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build, query or benchmark the semantic paper index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build")
+    build_parser.add_argument("snapshot")
+    build_parser.add_argument("--index-dir", default=DEFAULT_SEMANTIC_DIR)
+    build_parser.add_argument("--dim", type=int, default=256)
+    build_parser.add_argument("--fit-sample", type=int, default=50000)
+    build_parser.add_argument("--lists", type=int, default=None)
+
+    search_parser = subparsers.add_parser("search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--index-dir", default=DEFAULT_SEMANTIC_DIR)
+    search_parser.add_argument("-k", type=int, default=5)
+    search_parser.add_argument("--nprobe", type=int, default=8)
+
+    bench_parser = subparsers.add_parser("benchmark")
+    bench_parser.add_argument("queries", help="Text file with one query per line")
+    bench_parser.add_argument("--index-dir", default=DEFAULT_SEMANTIC_DIR)
+    bench_parser.add_argument("-k", type=int, default=10)
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_semantic_index(args.snapshot, args.index_dir, dim=args.dim, fit_sample=args.fit_sample,
+                             n_lists=args.lists)
+    elif args.command == "search":
+        index = SemanticIndex(args.index_dir, nprobe=args.nprobe)
+        start_time = time.time()
+        hits = index.search(args.query, k=args.k)
+        papers = index.fetch([doc_id for doc_id, _ in hits])
+        print(f"⏱ {len(papers)} results in {(time.time() - start_time) * 1000:.1f} ms")
+        for (_, score), paper in zip(hits, papers):
+            print(f"{score:6.3f}  {paper['id']}  {paper['title']}")
+    else:
+        with open(args.queries, "r", encoding="utf-8") as queries_file:
+            queries = [line.strip() for line in queries_file if line.strip()]
+        benchmark(SemanticIndex(args.index_dir), queries, k=args.k)
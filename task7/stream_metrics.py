@@ -0,0 +1,105 @@
+import json
+import time
+import statistics
+
+# ✅ **Token-Level Streaming Metrics + Throttled UI Flushes**
+
+
+class StreamMetrics:
+    """Collects time-to-first-token, inter-token latency and throughput for one streamed response."""
+
+    def __init__(self, model=None, source="llm"):
+        self.model = model
+        self.source = source
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+        self.last_token_time = None
+        self.end_time = None
+        self.tokens = 0
+        self.chars = 0
+        self.flushes = 0
+        self.inter_token_gaps = []
+
+    def on_token(self, chunk):
+        now = time.perf_counter()
+        if self.first_token_time is None:
+            self.first_token_time = now
+        else:
+            self.inter_token_gaps.append(now - self.last_token_time)
+        self.last_token_time = now
+        self.tokens += 1
+        self.chars += len(chunk)
+
+    def finish(self):
+        self.end_time = time.perf_counter()
+        return self
+
+    def to_dict(self):
+        end_time = self.end_time or time.perf_counter()
+        gaps = sorted(self.inter_token_gaps)
+        generation_time = (self.last_token_time - self.first_token_time) if self.tokens > 1 else 0.0
+        return {
+            "timestamp": time.time(),
+            "model": self.model,
+            "source": self.source,
+            "ttft_s": (self.first_token_time - self.start_time) if self.first_token_time is not None else None,
+            "total_s": end_time - self.start_time,
+            "tokens": self.tokens,
+            "chars": self.chars,
+            "tokens_per_s": (self.tokens - 1) / generation_time if generation_time > 0 else None,
+            "itl_mean_ms": statistics.mean(gaps) * 1000 if gaps else None,
+            "itl_p50_ms": gaps[len(gaps) // 2] * 1000 if gaps else None,
+            "itl_p95_ms": gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))] * 1000 if gaps else None,
+            "ui_flushes": self.flushes,
+        }
+
+    def summary_line(self):
+        data = self.to_dict()
+
+        def fmt(value, spec, unit):
+            return f"{value:{spec}}{unit}" if value is not None else "n/a"
+
+        return (f"⚡ TTFT: {fmt(data['ttft_s'], '.2f', ' s')} | Throughput: {fmt(data['tokens_per_s'], '.1f', ' tok/s')}"
+                f" | Inter-token p50/p95: {fmt(data['itl_p50_ms'], '.0f', '')}/{fmt(data['itl_p95_ms'], '.0f', ' ms')}"
+                f" | Tokens: {data['tokens']}")
+
+
+def log_metrics(metrics, path="stream_metrics.jsonl"):
+    """Appends one JSON line per response so runs can be exported and compared later."""
+    with open(path, "a", encoding="utf-8") as log_file:
+        log_file.write(json.dumps(metrics.to_dict()) + "\n")
+
+
+async def stream_to_placeholder(chunks, placeholder, metrics, flush_every_tokens=16, flush_every_ms=80):
+    """Consumes an async iterator of text chunks and renders it with throttled flushes.
+
+    Chunks go into an append-only buffer; the placeholder is rewritten only every
+    ``flush_every_tokens`` tokens or ``flush_every_ms`` milliseconds, and once at the end.
+    """
+    text, pending = "", []
+    last_flush = time.perf_counter()
+
+    def flush():
+        nonlocal text, last_flush
+        text += "".join(pending)
+        pending.clear()
+        placeholder.write(text)
+        metrics.flushes += 1
+        last_flush = time.perf_counter()
+
+    async for chunk in chunks:
+        metrics.on_token(chunk)
+        pending.append(chunk)
+        if len(pending) >= flush_every_tokens or (time.perf_counter() - last_flush) * 1000 >= flush_every_ms:
+            flush()
+
+    if pending or not metrics.flushes:
+        flush()
+    metrics.finish()
+    return text
+
+
+async def iterate(chunks):
+    """Wraps a plain iterable (e.g. a cached response) as an async chunk stream."""
+    for chunk in chunks:
+        yield chunk